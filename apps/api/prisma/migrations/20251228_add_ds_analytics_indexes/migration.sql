@@ -0,0 +1,19 @@
+-- Migration: Add DS Analytics Query Indexes
+-- Description: Composite/partial indexes for the DS analytics service's hot queries
+-- Date: 2025-12-28
+
+-- /stats groups every product by calculation method and aggregates confidence
+-- and usage; covering both lets Postgres answer it from the index alone
+CREATE INDEX IF NOT EXISTS "idx_products_usage_stats"
+ON "products"("usage_calculation_method", "usage_confidence", "monthly_usage_units");
+
+-- Snapshot-delta calculation: recent stock history for one product, in time order
+CREATE INDEX IF NOT EXISTS "stock_history_product_id_recorded_at_idx"
+ON "stock_history"("product_id", "recorded_at");
+
+-- Order-based calculation filters on LOWER(order_status) = 'completed', which the
+-- plain (product_id, date_submitted, order_status) index cannot serve.
+-- Partial expression index: not expressible in schema.prisma, managed here only.
+CREATE INDEX IF NOT EXISTS "idx_transactions_product_completed"
+ON "transactions"("product_id", "date_submitted")
+WHERE LOWER("order_status") = 'completed';
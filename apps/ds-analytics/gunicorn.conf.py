@@ -0,0 +1,29 @@
+"""
+Gunicorn configuration for DS Analytics
+
+Start with:
+    gunicorn -c gunicorn.conf.py main:app
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WORKERS", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app once in the master and fork it into the workers
+preload_app = True
+
+# Recycle workers periodically to cap memory growth from pandas/numpy allocations
+max_requests = 10000
+max_requests_jitter = 500
+
+# Batch calculations can run for minutes (see REQUEST_TIMEOUT_SECONDS)
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "360"))
+
+
+def post_fork(server, worker):
+    """Give each worker its own connections instead of the master's inherited pool"""
+    from models.database import engine, health_engine
+
+    engine.dispose(close=False)
+    health_engine.dispose(close=False)
@@ -2,17 +2,48 @@
 FastAPI Data Science Analytics Service
 Provides advanced usage calculation and inventory intelligence
 """
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
+from sqlalchemy import Row, case, func, select, text
 from sqlalchemy.orm import Session
-from typing import List
+from contextlib import asynccontextmanager
+from arq import create_pool
+from arq.connections import RedisSettings
+from cachetools import TTLCache
+from typing import AsyncIterator, Iterator, List, Sequence
 from datetime import datetime
 from threading import Lock
+import asyncio
 import logging
+import orjson
 import structlog
+import time
 import os
 
-from models.database import get_db, Product, Client, ClientConfiguration
+from models.database import get_db, get_health_db, engine, SessionLocal, Product, Client, ClientConfiguration
+
+# Configure logging: native structlog pipeline (no stdlib bridge) writing
+# orjson-encoded bytes straight to stdout; level filtering happens in the
+# bound logger so filtered calls are no-ops
+LOG_LEVEL = logging.getLevelName(os.getenv("LOG_LEVEL", "info").upper())
+
+structlog.configure(
+    processors=[
+        structlog.processors.add_log_level,
+        structlog.processors.TimeStamper(fmt="iso", utc=True),
+        structlog.processors.format_exc_info,
+        structlog.processors.JSONRenderer(serializer=orjson.dumps)
+    ],
+    wrapper_class=structlog.make_filtering_bound_logger(
+        LOG_LEVEL if isinstance(LOG_LEVEL, int) else logging.INFO
+    ),
+    context_class=dict,
+    logger_factory=structlog.BytesLoggerFactory(),
+    cache_logger_on_first_use=True,
+)
+
+logger = structlog.get_logger()
 
 
 # =============================================================================
@@ -39,9 +70,11 @@ class CircuitBreaker:
     def __init__(self, name: str):
         self.name = name
         self.failure_count = 0
-        self.last_failure_time: datetime | None = None
+        self.last_failure_time: datetime | None = None  # Wall clock, for status output only
+        self.last_failure_mono: float | None = None  # Monotonic, for recovery timing
         self.state = "CLOSED"
         self._lock = Lock()
+        self._log = logger.bind(name=name)
 
     def record_success(self):
         """Record a successful operation, reset failure count."""
@@ -53,38 +86,41 @@ class CircuitBreaker:
         """Record a failed operation, potentially open circuit."""
         with self._lock:
             self.failure_count += 1
+            self.last_failure_mono = time.monotonic()
             self.last_failure_time = datetime.now()
 
             if self.failure_count >= self.FAILURE_THRESHOLD:
                 self.state = "OPEN"
-                structlog.get_logger().warning(
+                self._log.warning(
                     "circuit_breaker_opened",
-                    name=self.name,
                     failure_count=self.failure_count
                 )
 
-    def can_execute(self) -> bool:
-        """Check if request should be allowed through."""
+    def tick(self) -> str:
+        """
+        Apply time-based transitions and return the resulting state.
+
+        An OPEN circuit becomes HALF_OPEN once RECOVERY_TIMEOUT has elapsed
+        since the last failure. This is the only place that takes the lock
+        on the request path.
+        """
         with self._lock:
-            if self.state == "CLOSED":
-                return True
-
-            if self.state == "OPEN":
-                # Check if recovery timeout has elapsed
-                if self.last_failure_time:
-                    elapsed = (datetime.now() - self.last_failure_time).total_seconds()
-                    if elapsed >= self.RECOVERY_TIMEOUT:
-                        self.state = "HALF_OPEN"
-                        structlog.get_logger().info(
-                            "circuit_breaker_half_open",
-                            name=self.name
-                        )
-                        return True
-                return False
+            if self.state == "OPEN" and self.last_failure_mono is not None:
+                elapsed = time.monotonic() - self.last_failure_mono
+                if elapsed >= self.RECOVERY_TIMEOUT:
+                    self.state = "HALF_OPEN"
+                    self._log.info("circuit_breaker_half_open")
+            return self.state
 
-            # HALF_OPEN: allow one request through to test
+    def can_execute(self) -> bool:
+        """Check if request should be allowed through."""
+        # CLOSED and HALF_OPEN both let requests through without locking;
+        # only an OPEN circuit needs to check whether it may recover.
+        if self.state != "OPEN":
             return True
 
+        return self.tick() != "OPEN"
+
     def get_status(self) -> dict:
         """Get current circuit breaker status."""
         with self._lock:
@@ -105,20 +141,23 @@ from models.schemas import (
     ClientRecalculationStatus,
     HealthCheckResponse,
     StatsResponse,
-    ValidationMessage,
     StockoutPrediction,
     ReorderSuggestion,
     ConfidenceInterval,
     FinancialMetrics as FinancialMetricsSchema
 )
-from services.usage_calculator import UsageCalculator
+from services.usage_calculator import UsageCalculator, UsageResult
 from services.data_validator import DataValidator
+from services.fuzzy_matcher import FuzzyMatcher
 from services.financial_calculator import FinancialCalculator
 from utils.statistical import (
     calculate_weeks_remaining,
+    calculate_weeks_remaining_batch,
     classify_stock_status,
+    classify_stock_status_batch,
     predict_stockout_date,
-    calculate_reorder_quantity
+    calculate_reorder_quantity,
+    calculate_reorder_quantity_batch
 )
 
 
@@ -140,43 +179,173 @@ def get_effective_lead_time(product, client_config, default: int = 14) -> tuple[
     # Priority 3: Default fallback
     return default, 'default'
 
-# Configure logging
-structlog.configure(
-    processors=[
-        structlog.stdlib.filter_by_level,
-        structlog.stdlib.add_logger_name,
-        structlog.stdlib.add_log_level,
-        structlog.stdlib.PositionalArgumentsFormatter(),
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.StackInfoRenderer(),
-        structlog.processors.format_exc_info,
-        structlog.processors.UnicodeDecoder(),
-        structlog.processors.JSONRenderer()
-    ],
-    context_class=dict,
-    logger_factory=structlog.stdlib.LoggerFactory(),
-    cache_logger_on_first_use=True,
+
+# Client rows change rarely; cache lookups per process for a short TTL.
+# Cached instances are detached from their session and treated as read-only.
+CLIENT_CACHE_TTL_SECONDS = 60
+_client_cache = TTLCache(maxsize=1024, ttl=CLIENT_CACHE_TTL_SECONDS)
+_client_config_cache = TTLCache(maxsize=1024, ttl=CLIENT_CACHE_TTL_SECONDS)
+
+
+def get_client_cached(db: Session, client_id: str) -> Client | None:
+    """Look up a client, served from the TTL cache when possible."""
+    client = _client_cache.get(client_id)
+    if client is None:
+        client = db.query(Client).filter(Client.id == client_id).first()
+        if client is not None:
+            db.expunge(client)
+            _client_cache[client_id] = client
+    return client
+
+
+def get_client_config_cached(db: Session, client_id: str) -> ClientConfiguration | None:
+    """Look up a client's configuration, served from the TTL cache when possible."""
+    config = _client_config_cache.get(client_id)
+    if config is None:
+        config = db.query(ClientConfiguration).filter(
+            ClientConfiguration.client_id == client_id
+        ).first()
+        if config is not None:
+            db.expunge(config)
+            _client_config_cache[client_id] = config
+    return config
+
+
+# Product columns read by the batch endpoint (metrics, validation, financials).
+# Fetched as plain rows: no ORM identity map or instance state per product.
+BATCH_PRODUCT_COLUMNS = (
+    Product.id,
+    Product.name,
+    Product.current_stock_packs,
+    Product.current_stock_units,
+    Product.pack_size,
+    Product.notification_point,
+    Product.item_type,
+    Product.is_active,
+    Product.total_lead_days,
+    Product.unit_cost,
+    Product.unit_price,
+    Product.holding_cost_rate,
+    Product.reorder_cost,
 )
 
-logger = structlog.get_logger()
+
+def load_batch_context(
+    db: Session,
+    client_id: str,
+    product_ids: List[str]
+) -> tuple[ClientConfiguration | None, dict[str, Row]]:
+    """
+    Load the client configuration and the requested products' columns for a batch.
+
+    Returns:
+        tuple: (client_config, {product_id: product row})
+    """
+    # Products and the client's configuration in a single round-trip; the
+    # configuration is joined on the batch client, so every row carries the same one
+    rows = db.execute(
+        select(*BATCH_PRODUCT_COLUMNS, ClientConfiguration).outerjoin(
+            ClientConfiguration, ClientConfiguration.client_id == client_id
+        ).where(
+            Product.client_id == client_id,
+            Product.id.in_(product_ids)
+        )
+    ).all()
+
+    products = {row.id: row for row in rows}
+    client_config = rows[0].ClientConfiguration if rows else None
+
+    return client_config, products
+
+
+def persist_usage_updates(db: Session, updates: List[dict]) -> None:
+    """Write queued product updates with one bulk UPDATE and a single commit."""
+    if updates:
+        db.bulk_update_mappings(Product, updates)
+    db.commit()
+
+
+def calculate_usage_on_calculator(
+    calculator: UsageCalculator, product_id: str, client_id: str, use_cache: bool = True
+) -> UsageResult:
+    """
+    Run one product's usage calculation on a calculator owned by a batch worker.
+
+    Executed in a worker thread. The calculator keeps its product and client
+    configuration caches across products, while its session is closed after
+    each product so the pooled connection is handed back between calculations.
+    """
+    try:
+        return calculator.calculate_monthly_usage_sync(
+            product_id=product_id,
+            client_id=client_id,
+            use_cache=use_cache
+        )
+    finally:
+        calculator.db.close()
+
+
+# Average days per month, as a reciprocal so daily rates are a multiply
+DAYS_PER_MONTH_INV = 1.0 / 30.44
+
+# Numeric score for each confidence level, used for the /stats average
+CONFIDENCE_LEVEL_SCORES = {'high': 0.85, 'medium': 0.65, 'low': 0.35}
 
 # Request timeout configuration
 REQUEST_TIMEOUT_SECONDS = int(os.getenv("REQUEST_TIMEOUT_SECONDS", "300"))  # 5 minutes default
 
+# Concurrent per-product calculations per batch; kept below DB_POOL_SIZE + DB_MAX_OVERFLOW (15)
+USAGE_CALC_CONCURRENCY = int(os.getenv("USAGE_CALC_CONCURRENCY", "12"))
+
+# Rows of queued product updates written per checkpoint commit during a batch
+USAGE_CHECKPOINT_ROWS = 100
+
 # Create FastAPI app
+# Redis-backed job queue for client recalculations (see worker.py)
+REDIS_URL = os.getenv("REDIS_URL")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared services and the job queue connection on startup; close on shutdown."""
+    # Stateless helpers are shared across requests instead of built per call
+    app.state.validator = DataValidator()
+    app.state.matcher = FuzzyMatcher()
+
+    app.state.job_queue = None
+    if REDIS_URL:
+        try:
+            app.state.job_queue = await create_pool(RedisSettings.from_dsn(REDIS_URL))
+        except Exception as e:
+            logger.warning("job_queue_unavailable", error=str(e))
+
+    yield
+
+    if app.state.job_queue is not None:
+        await app.state.job_queue.close()
+
+
 app = FastAPI(
     title="DS Analytics Service",
     version="1.0.0",
-    description="Data science analytics for inventory intelligence"
+    description="Data science analytics for inventory intelligence",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS middleware - Use environment-based configuration for security
-ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "").split(",") if os.getenv("ALLOWED_ORIGINS") else [
+ALLOWED_ORIGINS = [
+    origin.strip() for origin in os.getenv("ALLOWED_ORIGINS", "").split(",") if origin.strip()
+] or [
     "https://admin.yourtechassist.us",
     "https://portal.yourtechassist.us",
     "https://api.yourtechassist.us",
 ]
 
+# Optional pattern for origins that can't be listed exactly (e.g. preview deployments).
+# Starlette compiles it once at startup; exact origins above are checked first.
+ALLOWED_ORIGIN_REGEX = os.getenv("ALLOWED_ORIGIN_REGEX") or None
+
 # In development, allow localhost
 if os.getenv("ENVIRONMENT", "production") == "development":
     ALLOWED_ORIGINS.extend([
@@ -188,6 +357,7 @@ if os.getenv("ENVIRONMENT", "production") == "development":
 app.add_middleware(
     CORSMiddleware,
     allow_origins=ALLOWED_ORIGINS,
+    allow_origin_regex=ALLOWED_ORIGIN_REGEX,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["Authorization", "Content-Type", "X-Requested-With"],
@@ -200,17 +370,12 @@ async def request_timeout_middleware(request, call_next):
     Middleware to enforce request timeout.
     Long-running calculations will be terminated after REQUEST_TIMEOUT_SECONDS.
     """
-    import asyncio
-    from starlette.responses import JSONResponse
-
     try:
-        # Use asyncio.wait_for to enforce timeout
-        response = await asyncio.wait_for(
-            call_next(request),
-            timeout=REQUEST_TIMEOUT_SECONDS
-        )
+        # asyncio.timeout (3.11+) cancels in place without wrapping the call in a new Task
+        async with asyncio.timeout(REQUEST_TIMEOUT_SECONDS):
+            response = await call_next(request)
         return response
-    except asyncio.TimeoutError:
+    except TimeoutError:
         logger.error(
             "request_timeout",
             path=request.url.path,
@@ -225,23 +390,42 @@ async def request_timeout_middleware(request, call_next):
             }
         )
 
+# Health probes are answered from cache for a short window to avoid hammering the DB
+HEALTH_CACHE_TTL_SECONDS = float(os.getenv("HEALTH_CACHE_TTL_SECONDS", "5"))
+_health_cache = {"ts": 0.0, "result": None}
+
+# Ping statement built once rather than per probe
+HEALTH_PING = text("SELECT 1")
+
+
+@app.get("/health/live")
+async def liveness_check():
+    """
+    Liveness probe: the process is up and serving requests.
+    Never touches the database; use /health for readiness.
+    """
+    return {"status": "alive"}
+
+
 @app.get("/health", response_model=HealthCheckResponse)
-async def health_check(db: Session = Depends(get_db)):
+async def health_check(db: Session = Depends(get_health_db)):
     """
     Health check endpoint with comprehensive status.
     Checks database connectivity, circuit breaker state, and pool health.
+    Uses a dedicated connection pool and caches the result for HEALTH_CACHE_TTL_SECONDS.
     """
-    from sqlalchemy import text
+    now = time.monotonic()
+    if _health_cache["result"] is not None and now - _health_cache["ts"] < HEALTH_CACHE_TTL_SECONDS:
+        return _health_cache["result"]
 
     db_connected = False
     db_latency_ms = None
 
     try:
         # Test database connection with timing
-        import time
-        start = time.time()
-        db.execute(text("SELECT 1"))
-        db_latency_ms = round((time.time() - start) * 1000, 2)
+        start = time.perf_counter()
+        db.execute(HEALTH_PING)
+        db_latency_ms = round((time.perf_counter() - start) * 1000, 2)
         db_connected = True
         db_circuit_breaker.record_success()
     except Exception as e:
@@ -255,54 +439,55 @@ async def health_check(db: Session = Depends(get_db)):
     # Unhealthy if: DB disconnected OR circuit is OPEN
     is_healthy = db_connected and circuit_status["state"] != "OPEN"
 
-    return HealthCheckResponse(
+    result = HealthCheckResponse(
         status="healthy" if is_healthy else "unhealthy",
         database_connected=db_connected,
         version="1.0.0",
-        timestamp=datetime.now().isoformat()
+        timestamp=datetime.now().isoformat(),
+        db_latency_ms=db_latency_ms,
+        pool_status=engine.pool.status()
     )
 
+    _health_cache["ts"] = now
+    _health_cache["result"] = result
+
+    return result
+
 @app.get("/stats", response_model=StatsResponse)
 async def get_stats(db: Session = Depends(get_db)):
     """Get usage calculation statistics"""
-    from sqlalchemy import func
-
-    total_products = db.query(func.count(Product.id)).scalar()
+    # Average confidence (map to numeric); NULL confidence is excluded from the average
+    conf_value = case(
+        *((Product.usage_confidence == level, score) for level, score in CONFIDENCE_LEVEL_SCORES.items()),
+        (Product.usage_confidence.isnot(None), 0.0),
+    )
 
-    products_with_usage = db.query(func.count(Product.id)).filter(
-        Product.monthly_usage_units.isnot(None),
-        Product.monthly_usage_units > 0
-    ).scalar()
+    # Single round-trip: conditional aggregates per calculation method (a handful
+    # of groups), rolled up in Python into the overall totals
+    rows = db.query(
+        Product.usage_calculation_method,
+        func.count(Product.id),
+        func.count(case((Product.monthly_usage_units > 0, 1))),
+        func.count(case((Product.usage_confidence == 'high', 1))),
+        func.count(case((Product.usage_confidence == 'medium', 1))),
+        func.count(case((Product.usage_confidence == 'low', 1))),
+        func.sum(conf_value),
+        func.count(conf_value),
+    ).group_by(Product.usage_calculation_method).all()
+
+    total_products = sum(row[1] for row in rows)
+    products_with_usage = sum(row[2] for row in rows)
+    high_confidence = sum(row[3] for row in rows)
+    medium_confidence = sum(row[4] for row in rows)
+    low_confidence = sum(row[5] for row in rows)
+    conf_sum = sum(float(row[6] or 0) for row in rows)
+    conf_count = sum(row[7] for row in rows)
 
     products_needing_calculation = total_products - products_with_usage
-
-    # Confidence stats
-    high_confidence = db.query(func.count(Product.id)).filter(
-        Product.usage_confidence == 'high'
-    ).scalar()
-
-    medium_confidence = db.query(func.count(Product.id)).filter(
-        Product.usage_confidence == 'medium'
-    ).scalar()
-
-    low_confidence = db.query(func.count(Product.id)).filter(
-        Product.usage_confidence == 'low'
-    ).scalar()
-
-    # Average confidence (map to numeric)
-    products_with_conf = db.query(Product).filter(
-        Product.usage_confidence.isnot(None)
-    ).all()
-
-    conf_map = {'high': 0.85, 'medium': 0.65, 'low': 0.35}
-    avg_conf = sum(conf_map.get(p.usage_confidence, 0) for p in products_with_conf) / len(products_with_conf) if products_with_conf else 0
+    avg_conf = conf_sum / conf_count if conf_count else 0
 
     # Calculation methods
-    from collections import Counter
-    methods = [p.usage_calculation_method for p in db.query(Product).filter(
-        Product.usage_calculation_method.isnot(None)
-    ).all()]
-    method_counts = dict(Counter(methods))
+    method_counts = {row[0]: row[1] for row in rows if row[0] is not None}
 
     return StatsResponse(
         total_products=total_products,
@@ -315,17 +500,23 @@ async def get_stats(db: Session = Depends(get_db)):
         calculation_methods=method_counts
     )
 
-@app.post("/calculate-usage", response_model=List[UsageCalculationResponse])
-async def calculate_usage_batch(
+async def iter_usage_calculations(
     request: CalculateUsageRequest,
-    db: Session = Depends(get_db)
-):
+    db: Session,
+    validator: DataValidator
+) -> AsyncIterator[UsageCalculationResponse]:
     """
-    Calculate monthly usage for multiple products
+    Calculate usage for a batch of products, yielding one response per product.
 
-    This endpoint performs advanced usage calculation using multiple methods
-    and returns comprehensive metrics including confidence scores, trends,
-    and reorder suggestions.
+    Responses are yielded in completion order: whatever calculations have
+    finished are turned into responses together (so financial metrics stay
+    vectorized) while the rest keep running. Product updates are written with
+    a bulk UPDATE + commit every USAGE_CHECKPOINT_ROWS rows and once more when
+    the batch finishes (or the consumer stops iterating).
+
+    The batch raises TimeoutError once REQUEST_TIMEOUT_SECONDS have passed.
+    A streamed body is sent after request_timeout_middleware has returned, so
+    the deadline is enforced here rather than left to the middleware.
     """
     logger.info(
         "usage_calculation_batch_started",
@@ -333,48 +524,158 @@ async def calculate_usage_batch(
         product_count=len(request.product_ids)
     )
 
-    calculator = UsageCalculator(db)
-    validator = DataValidator()
-    results = []
+    updates = []
+    calculated = 0
 
-    # Get client configuration for lead time settings
-    client_config = db.query(ClientConfiguration).filter(
-        ClientConfiguration.client_id == request.client_id
-    ).first()
+    # Blocking ORM reads run in the threadpool so the event loop stays free
+    client_config, products = await asyncio.to_thread(
+        load_batch_context, db, request.client_id, request.product_ids
+    )
 
+    found_ids = []
     for product_id in request.product_ids:
+        if product_id in products:
+            found_ids.append(product_id)
+        else:
+            logger.warning("product_not_found", product_id=product_id)
+
+    # Up to USAGE_CALC_CONCURRENCY calculators, each on its own session, are
+    # handed out to one product at a time and reused for the rest of the batch
+    idle_calculators = asyncio.Queue()
+    for _ in range(min(USAGE_CALC_CONCURRENCY, len(found_ids))):
+        idle_calculators.put_nowait(UsageCalculator(SessionLocal()))
+
+    async def calculate(product_id: str):
+        # Calculations run in the threadpool; a failure is returned as the
+        # result and only affects that product
+        calculator = await idle_calculators.get()
         try:
-            # Get product info
-            product = db.query(Product).filter(Product.id == product_id).first()
-            if not product:
-                logger.warning("product_not_found", product_id=product_id)
-                continue
-
-            # Calculate usage
-            usage_result = await calculator.calculate_monthly_usage(
-                product_id=product_id,
-                client_id=request.client_id
+            result = await asyncio.to_thread(
+                calculate_usage_on_calculator, calculator, product_id,
+                request.client_id, not request.force_recalculate
+            )
+        except Exception as e:
+            result = e
+        finally:
+            idle_calculators.put_nowait(calculator)
+        return product_id, result
+
+    pending = {asyncio.create_task(calculate(product_id)) for product_id in found_ids}
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + REQUEST_TIMEOUT_SECONDS
+
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=max(deadline - loop.time(), 0),
+                return_when=asyncio.FIRST_COMPLETED
             )
+            if not done:
+                logger.error(
+                    "usage_calculation_batch_timeout",
+                    client_id=request.client_id,
+                    products_calculated=calculated,
+                    products_pending=len(pending),
+                    timeout_seconds=REQUEST_TIMEOUT_SECONDS
+                )
+                raise TimeoutError(f"Usage batch timed out after {REQUEST_TIMEOUT_SECONDS} seconds")
+
+            done_ids, usage_results = zip(*(task.result() for task in done))
+
+            for response in _build_usage_responses(
+                done_ids, usage_results, products, client_config, validator, updates
+            ):
+                calculated += 1
+                yield response
+
+            # Checkpoint commit, off the event loop
+            if len(updates) >= USAGE_CHECKPOINT_ROWS:
+                await asyncio.to_thread(persist_usage_updates, db, updates)
+                updates = []
+    finally:
+        for task in pending:
+            task.cancel()
+
+        await asyncio.to_thread(persist_usage_updates, db, updates)
+
+        logger.info(
+            "usage_calculation_batch_completed",
+            client_id=request.client_id,
+            products_calculated=calculated
+        )
+
 
-            # Calculate derivative metrics
-            weeks_remaining = calculate_weeks_remaining(
-                product.current_stock_packs or 0,
-                usage_result.monthly_usage_packs
+def _build_usage_responses(
+    found_ids: Sequence[str],
+    usage_results: Sequence,
+    products: dict[str, Row],
+    client_config: ClientConfiguration | None,
+    validator: DataValidator,
+    updates: List[dict]
+) -> Iterator[UsageCalculationResponse]:
+    """Derive metrics for calculated products, queue their updates and yield responses."""
+    responses = []
+    financial_inputs = []  # (response, product, days_until_stockout, daily_usage, lead_time_days)
+
+    calculated = []
+    for product_id, usage_result in zip(found_ids, usage_results):
+        if isinstance(usage_result, Exception):
+            logger.error(
+                "usage_calculation_failed",
+                product_id=product_id,
+                error=str(usage_result),
+                exc_info=usage_result
             )
+            continue
+        calculated.append((product_id, usage_result))
 
-            stock_status = classify_stock_status(weeks_remaining)
+    # Weeks remaining and stock status for the whole batch in one pass each
+    weeks_remaining_list = calculate_weeks_remaining_batch(
+        [products[product_id].current_stock_packs or 0 for product_id, _ in calculated],
+        [usage_result.monthly_usage_packs for _, usage_result in calculated]
+    )
+    stock_statuses = classify_stock_status_batch(weeks_remaining_list).tolist()
+
+    # Reorder quantities for every product with usage, in one vectorized pass
+    lead_times = [get_effective_lead_time(products[product_id], client_config) for product_id, _ in calculated]
+    reordering = [
+        index for index, (_, usage_result) in enumerate(calculated)
+        if usage_result.monthly_usage_units > 0
+    ]
+    reorder_infos = dict(zip(reordering, calculate_reorder_quantity_batch(
+        monthly_usage=[calculated[index][1].monthly_usage_units for index in reordering],
+        lead_time_days=[lead_times[index][0] for index in reordering],
+        safety_stock_weeks=client_config.safety_stock_weeks if client_config else 2,
+        current_stock=[products[calculated[index][0]].current_stock_packs or 0 for index in reordering],
+        pack_size=[products[calculated[index][0]].pack_size or 1 for index in reordering]
+    )))
+
+    for index, ((product_id, usage_result), weeks_remaining, stock_status) in enumerate(zip(
+        calculated, weeks_remaining_list, stock_statuses
+    )):
+        product = products[product_id]
+
+        try:
+            now = datetime.now()
+            daily_usage = (
+                usage_result.monthly_usage_units * DAYS_PER_MONTH_INV
+                if usage_result.monthly_usage_units > 0 else 0
+            )
 
             # Predict stockout
             stockout_pred = None
+            projected_stockout_date = None
             if usage_result.monthly_usage_units > 0:
-                daily_usage = usage_result.monthly_usage_units / 30.44
                 stockout_info = predict_stockout_date(
                     current_stock=product.current_stock_units or 0,
                     daily_usage_rate=daily_usage,
-                    usage_variance=usage_result.variance
+                    usage_variance=usage_result.variance,
+                    now=now
                 )
 
                 if stockout_info['predicted_date']:
+                    projected_stockout_date = stockout_info['predicted_date_dt']
                     stockout_pred = StockoutPrediction(
                         predicted_date=stockout_info['predicted_date'],
                         days_until_stockout=stockout_info['days_until_stockout'],
@@ -387,19 +688,10 @@ async def calculate_usage_batch(
 
             # Generate reorder suggestion
             reorder_suggestion = None
-            lead_time_days, lead_time_source = get_effective_lead_time(product, client_config)
+            lead_time_days, lead_time_source = lead_times[index]
 
-            if usage_result.monthly_usage_units > 0:
-                # Get safety stock weeks from client config or default
-                safety_weeks = client_config.safety_stock_weeks if client_config else 2
-
-                reorder_info = calculate_reorder_quantity(
-                    monthly_usage=usage_result.monthly_usage_units,
-                    lead_time_days=lead_time_days,
-                    safety_stock_weeks=safety_weeks,
-                    current_stock=product.current_stock_packs or 0,
-                    pack_size=product.pack_size or 1
-                )
+            if index in reorder_infos:
+                reorder_info = reorder_infos[index]
 
                 # Add lead time metadata to reorder info
                 reorder_info['lead_time_days'] = lead_time_days
@@ -410,45 +702,28 @@ async def calculate_usage_batch(
             # Validate
             validation_msgs = validator.validate_usage_result(usage_result, product)
 
-            # Calculate financial metrics
-            financial_metrics = None
-            if product.unit_cost:
-                daily_usage = usage_result.monthly_usage_units / 30.44 if usage_result.monthly_usage_units > 0 else 0
-                days_until_stockout = stockout_pred.days_until_stockout if stockout_pred else None
-
-                fin_metrics = FinancialCalculator.calculate_full_metrics(
-                    stock_units=product.current_stock_units or 0,
-                    unit_cost=product.unit_cost,
-                    unit_price=product.unit_price,
-                    holding_cost_rate=product.holding_cost_rate,
-                    reorder_cost=product.reorder_cost,
-                    days_until_stockout=days_until_stockout,
-                    daily_usage=daily_usage,
-                    lead_time_days=lead_time_days
-                )
-                financial_metrics = FinancialMetricsSchema(**fin_metrics.to_dict())
-
-            # Update product in database
-            product.monthly_usage_units = usage_result.monthly_usage_units
-            product.monthly_usage_packs = usage_result.monthly_usage_packs
-            product.usage_data_months = usage_result.data_months
-            product.usage_calculation_tier = usage_result.calculation_tier
-            product.usage_confidence = usage_result.confidence_level
-            product.usage_last_calculated = datetime.now()
-            product.usage_calculation_method = usage_result.calculation_method
-            product.usage_trend = usage_result.trend_direction
-            product.seasonality_detected = usage_result.seasonality_detected
-            product.weeks_remaining = weeks_remaining
-            product.stock_status = stock_status
-            product.projected_stockout_date = datetime.fromisoformat(stockout_pred.predicted_date) if stockout_pred and stockout_pred.predicted_date else None
-            product.stockout_confidence = stockout_pred.confidence_score if stockout_pred else None
-            product.suggested_reorder_qty = reorder_suggestion.suggested_quantity_packs if reorder_suggestion else None
-            product.reorder_qty_last_updated = datetime.now()
-
-            db.commit()
+            # Queue product update (flushed in bulk after the loop)
+            updates.append({
+                "id": product_id,
+                "monthly_usage_units": usage_result.monthly_usage_units,
+                "monthly_usage_packs": usage_result.monthly_usage_packs,
+                "usage_data_months": usage_result.data_months,
+                "usage_calculation_tier": usage_result.calculation_tier,
+                "usage_confidence": usage_result.confidence_level,
+                "usage_last_calculated": now,
+                "usage_calculation_method": usage_result.calculation_method,
+                "usage_trend": usage_result.trend_direction,
+                "seasonality_detected": usage_result.seasonality_detected,
+                "weeks_remaining": weeks_remaining,
+                "stock_status": stock_status,
+                "projected_stockout_date": projected_stockout_date,
+                "stockout_confidence": stockout_pred.confidence_score if stockout_pred else None,
+                "suggested_reorder_qty": reorder_suggestion.suggested_quantity_packs if reorder_suggestion else None,
+                "reorder_qty_last_updated": now,
+            })
 
             # Build response
-            results.append(UsageCalculationResponse(
+            response = UsageCalculationResponse(
                 product_id=product_id,
                 product_name=product.name,
                 monthly_usage_units=usage_result.monthly_usage_units,
@@ -465,10 +740,10 @@ async def calculate_usage_batch(
                 outliers_detected=usage_result.outliers_detected,
                 predicted_stockout=stockout_pred,
                 reorder_suggestion=reorder_suggestion,
-                financial_metrics=financial_metrics,
-                validation_messages=[ValidationMessage(**m.to_dict()) for m in validation_msgs],
-                calculated_at=datetime.now().isoformat()
-            ))
+                financial_metrics=None,  # Filled in below for the whole batch
+                validation_messages=validation_msgs,
+                calculated_at=now
+            )
 
             logger.info(
                 "usage_calculated",
@@ -484,31 +759,127 @@ async def calculate_usage_batch(
                 error=str(e),
                 exc_info=True
             )
-            db.rollback()
             continue
 
-    logger.info(
-        "usage_calculation_batch_completed",
-        client_id=request.client_id,
-        products_calculated=len(results)
-    )
+        if product.unit_cost:
+            days_until_stockout = stockout_pred.days_until_stockout if stockout_pred else None
+            financial_inputs.append((response, product, days_until_stockout, daily_usage, lead_time_days))
+
+        responses.append(response)
+
+    # Calculate financial metrics for all costed products in one vectorized pass
+    if financial_inputs:
+        fin_metrics = FinancialCalculator.calculate_full_metrics_batch(
+            stock_units=[product.current_stock_units or 0 for _, product, *_ in financial_inputs],
+            unit_cost=[product.unit_cost for _, product, *_ in financial_inputs],
+            unit_price=[product.unit_price for _, product, *_ in financial_inputs],
+            holding_cost_rate=[product.holding_cost_rate for _, product, *_ in financial_inputs],
+            reorder_cost=[product.reorder_cost for _, product, *_ in financial_inputs],
+            days_until_stockout=[days for _, _, days, _, _ in financial_inputs],
+            daily_usage=[usage for _, _, _, usage, _ in financial_inputs],
+            lead_time_days=[lead for *_, lead in financial_inputs]
+        )
+        for (response, *_), metrics in zip(financial_inputs, fin_metrics):
+            response.financial_metrics = FinancialMetricsSchema(**metrics.to_dict())
+
+    yield from responses
 
-    return results
+
+@app.post("/calculate-usage", response_model=List[UsageCalculationResponse])
+async def calculate_usage_batch(
+    request: CalculateUsageRequest,
+    http_request: Request,
+    db: Session = Depends(get_db)
+):
+    """
+    Calculate monthly usage for multiple products
+
+    This endpoint performs advanced usage calculation using multiple methods
+    and returns comprehensive metrics including confidence scores, trends,
+    and reorder suggestions.
+
+    Results are returned in the order of `product_ids` (products that are not
+    found or fail to calculate are left out). Clients sending
+    `Accept: application/x-ndjson` instead receive one JSON object per line as
+    each product completes, in completion order; the stream ends early if the
+    batch exceeds REQUEST_TIMEOUT_SECONDS.
+    """
+    validator = http_request.app.state.validator
+
+    if "application/x-ndjson" in http_request.headers.get("accept", ""):
+        async def ndjson_lines():
+            async for response in iter_usage_calculations(request, db, validator):
+                yield orjson.dumps(response.model_dump()) + b"\n"
+
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+    try:
+        responses = [
+            response async for response in iter_usage_calculations(request, db, validator)
+        ]
+    except TimeoutError:
+        raise HTTPException(
+            status_code=504,
+            detail=f"Request timed out after {REQUEST_TIMEOUT_SECONDS} seconds"
+        )
+
+    # Calculations complete in any order; the array follows the request
+    positions = {}
+    for position, product_id in enumerate(request.product_ids):
+        positions.setdefault(product_id, position)
+    responses.sort(key=lambda response: positions[response.product_id])
+
+    # Dump each model once and hand orjson plain dicts (datetimes included, orjson
+    # encodes them natively); returning a Response skips FastAPI's second
+    # validation/serialization pass over the batch
+    return ORJSONResponse([response.model_dump() for response in responses])
 
 @app.post("/calculate-usage/client/{client_id}", response_model=ClientRecalculationStatus)
 async def calculate_usage_for_client(
     client_id: str,
+    http_request: Request,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """
     Recalculate usage for all products of a client (async background job)
+
+    The job is enqueued for the arq worker when Redis is configured, keeping
+    the API workers free. Without a queue it falls back to an in-process
+    background task.
     """
     # Verify client exists
-    client = db.query(Client).filter(Client.id == client_id).first()
+    client = get_client_cached(db, client_id)
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
 
+    job_queue = http_request.app.state.job_queue
+    if job_queue is not None:
+        # Deterministic job id: a recalculation still queued or running for this
+        # client is not duplicated (the worker keeps no results, so a finished
+        # job does not block the next one)
+        task_id = f"recalculate-client:{client_id}"
+        job = await job_queue.enqueue_job(
+            "recalculate_client_usage",
+            client_id,
+            _job_id=task_id
+        )
+
+        if job is None:
+            return ClientRecalculationStatus(
+                client_id=client_id,
+                status="already_queued",
+                message=f"Usage calculation already queued or running for client {client.name}",
+                task_id=task_id
+            )
+
+        return ClientRecalculationStatus(
+            client_id=client_id,
+            status="started",
+            message=f"Usage calculation queued for client {client.name}",
+            task_id=task_id
+        )
+
     # Add background task
     background_tasks.add_task(
         recalculate_client_usage_background,
@@ -519,7 +890,7 @@ async def calculate_usage_for_client(
         client_id=client_id,
         status="started",
         message=f"Usage calculation started for client {client.name}",
-        task_id=None  # Could use Celery task ID if implemented
+        task_id=None
     )
 
 async def recalculate_client_usage_background(client_id: str):
@@ -527,8 +898,6 @@ async def recalculate_client_usage_background(client_id: str):
     Background task to recalculate usage for all client products.
     Uses circuit breaker pattern to prevent cascading failures.
     """
-    from models.database import SessionLocal
-
     # Check circuit breaker before starting
     if not db_circuit_breaker.can_execute():
         logger.warning(
@@ -538,9 +907,11 @@ async def recalculate_client_usage_background(client_id: str):
         )
         return
 
-    db = SessionLocal()
+    # Loaded products are only read for the rest of the run, so checkpoint commits must not expire them
+    db = SessionLocal(expire_on_commit=False)
     consecutive_failures = 0
     MAX_CONSECUTIVE_FAILURES = 5  # Stop processing if too many consecutive failures
+    COMMIT_EVERY = 100  # Checkpoint commit interval (products)
 
     try:
         logger.info("client_recalculation_started", client_id=client_id)
@@ -551,12 +922,20 @@ async def recalculate_client_usage_background(client_id: str):
             Product.is_active == True
         ).all()
 
-        product_ids = [p.id for p in products]
+        # Lead time / safety stock come from the client configuration, as in the batch endpoint
+        client_config = get_client_config_cached(db, client_id)
+        safety_weeks = client_config.safety_stock_weeks if client_config else 2
 
-        # Calculate usage for each product
+        # Calculate usage for each product; updates are staged as mappings and
+        # written with one bulk UPDATE per checkpoint. Usage is calculated a
+        # checkpoint's worth of products at a time with grouped queries.
         calculator = UsageCalculator(db)
+        updates = []
+        usage_results = {}
+
+        for index, product in enumerate(products):
+            product_id = product.id
 
-        for product_id in product_ids:
             # Check if we should stop due to too many consecutive failures
             if consecutive_failures >= MAX_CONSECUTIVE_FAILURES:
                 logger.error(
@@ -569,62 +948,74 @@ async def recalculate_client_usage_background(client_id: str):
                 break
 
             try:
-                usage_result = await calculator.calculate_monthly_usage(
-                    product_id=product_id,
-                    client_id=client_id
-                )
+                if product_id not in usage_results:
+                    # Savepoint per chunk: a failed query leaves the session usable
+                    # and the next product retries the chunk from there
+                    chunk_ids = [p.id for p in products[index:index + COMMIT_EVERY]]
+                    with db.begin_nested():
+                        usage_results = await calculator.calculate_monthly_usage_batch(
+                            chunk_ids, client_id
+                        )
+
+                usage_result = usage_results.pop(product_id)
+                if isinstance(usage_result, Exception):
+                    raise usage_result
 
                 # Update product with ALL metrics (matching batch endpoint)
-                product = db.query(Product).filter(Product.id == product_id).first()
-                if product:
-                    # Core usage metrics
-                    product.monthly_usage_units = usage_result.monthly_usage_units
-                    product.monthly_usage_packs = usage_result.monthly_usage_packs
-                    product.usage_data_months = usage_result.data_months
-                    product.usage_calculation_tier = usage_result.calculation_tier
-                    product.usage_confidence = usage_result.confidence_level
-                    product.usage_last_calculated = datetime.now()
-                    product.usage_calculation_method = usage_result.calculation_method
-                    product.usage_trend = usage_result.trend_direction
-                    product.seasonality_detected = usage_result.seasonality_detected
-
-                    # Calculate derivative metrics
-                    weeks_remaining = calculate_weeks_remaining(
-                        product.current_stock_packs or 0,
-                        usage_result.monthly_usage_packs
+                now = datetime.now()
+
+                # Core usage metrics
+                update = {
+                    "id": product_id,
+                    "monthly_usage_units": usage_result.monthly_usage_units,
+                    "monthly_usage_packs": usage_result.monthly_usage_packs,
+                    "usage_data_months": usage_result.data_months,
+                    "usage_calculation_tier": usage_result.calculation_tier,
+                    "usage_confidence": usage_result.confidence_level,
+                    "usage_last_calculated": now,
+                    "usage_calculation_method": usage_result.calculation_method,
+                    "usage_trend": usage_result.trend_direction,
+                    "seasonality_detected": usage_result.seasonality_detected,
+                }
+
+                # Calculate derivative metrics
+                weeks_remaining = calculate_weeks_remaining(
+                    product.current_stock_packs or 0,
+                    usage_result.monthly_usage_packs
+                )
+                update["weeks_remaining"] = weeks_remaining
+                update["stock_status"] = classify_stock_status(weeks_remaining)
+
+                # Stockout prediction
+                if usage_result.monthly_usage_units > 0:
+                    daily_usage = usage_result.monthly_usage_units * DAYS_PER_MONTH_INV
+                    stockout_info = predict_stockout_date(
+                        current_stock=product.current_stock_units or 0,
+                        daily_usage_rate=daily_usage,
+                        usage_variance=usage_result.variance,
+                        now=now
                     )
-                    stock_status = classify_stock_status(weeks_remaining)
-
-                    product.weeks_remaining = weeks_remaining
-                    product.stock_status = stock_status
-
-                    # Stockout prediction
-                    if usage_result.monthly_usage_units > 0:
-                        daily_usage = usage_result.monthly_usage_units / 30.44
-                        stockout_info = predict_stockout_date(
-                            current_stock=product.current_stock_units or 0,
-                            daily_usage_rate=daily_usage,
-                            usage_variance=usage_result.variance
-                        )
-                        if stockout_info.get('predicted_date'):
-                            product.projected_stockout_date = datetime.fromisoformat(stockout_info['predicted_date'])
-                            product.stockout_confidence = stockout_info.get('confidence_score')
-
-                    # Reorder suggestion
-                    if usage_result.monthly_usage_units > 0:
-                        reorder_info = calculate_reorder_quantity(
-                            monthly_usage=usage_result.monthly_usage_units,
-                            lead_time_days=14,  # Default lead time
-                            safety_stock_weeks=2,  # Default safety stock
-                            current_stock=product.current_stock_packs or 0,
-                            pack_size=product.pack_size or 1
-                        )
-                        product.suggested_reorder_qty = reorder_info.get('suggested_quantity_packs')
-                        product.reorder_qty_last_updated = datetime.now()
+                    if stockout_info.get('predicted_date'):
+                        update["projected_stockout_date"] = stockout_info['predicted_date_dt']
+                        update["stockout_confidence"] = stockout_info.get('confidence_score')
+
+                # Reorder suggestion
+                if usage_result.monthly_usage_units > 0:
+                    lead_time_days, _ = get_effective_lead_time(product, client_config)
+                    reorder_info = calculate_reorder_quantity(
+                        monthly_usage=usage_result.monthly_usage_units,
+                        lead_time_days=lead_time_days,
+                        safety_stock_weeks=safety_weeks,
+                        current_stock=product.current_stock_packs or 0,
+                        pack_size=product.pack_size or 1
+                    )
+                    update["suggested_reorder_qty"] = reorder_info.get('suggested_quantity_packs')
+                    update["reorder_qty_last_updated"] = now
 
-                    db.commit()
-                    consecutive_failures = 0  # Reset on success
-                    db_circuit_breaker.record_success()
+                updates.append(update)
+
+                consecutive_failures = 0  # Reset on success
+                db_circuit_breaker.record_success()
 
             except Exception as e:
                 consecutive_failures += 1
@@ -634,13 +1025,30 @@ async def recalculate_client_usage_background(client_id: str):
                     error=str(e),
                     consecutive_failures=consecutive_failures
                 )
-                db.rollback()
-                continue
+
+            # Checkpoint outside the per-product handling: a failed write is the
+            # staged batch's failure, so roll back and drop that batch rather
+            # than leave the session unusable for the products after it
+            if len(updates) >= COMMIT_EVERY:
+                try:
+                    persist_usage_updates(db, updates)
+                except Exception as e:
+                    db.rollback()
+                    db_circuit_breaker.record_failure()
+                    logger.error(
+                        "usage_checkpoint_failed",
+                        client_id=client_id,
+                        updates_dropped=len(updates),
+                        error=str(e)
+                    )
+                updates = []
+
+        persist_usage_updates(db, updates)
 
         logger.info(
             "client_recalculation_completed",
             client_id=client_id,
-            products_processed=len(product_ids)
+            products_processed=len(products)
         )
 
     except Exception as e:
@@ -656,6 +1064,7 @@ async def recalculate_client_usage_background(client_id: str):
 @app.post("/reconcile/fuzzy")
 async def reconcile_fuzzy(
     request: dict,
+    http_request: Request,
     db: Session = Depends(get_db)
 ):
     """
@@ -688,8 +1097,6 @@ async def reconcile_fuzzy(
         }
     """
     try:
-        from services.fuzzy_matcher import FuzzyMatcher
-
         logger.info(
             "fuzzy_reconciliation_started",
             orphan_id=request.get('orphan', {}).get('id'),
@@ -705,8 +1112,7 @@ async def reconcile_fuzzy(
         if not candidates:
             raise HTTPException(status_code=400, detail="Missing 'candidates' in request body")
 
-        # Initialize fuzzy matcher
-        matcher = FuzzyMatcher()
+        matcher = http_request.app.state.matcher
 
         # Find matches
         matches = matcher.match_product(orphan, candidates, max_results=3)
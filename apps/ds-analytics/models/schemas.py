@@ -1,7 +1,7 @@
 """
 Pydantic schemas for request/response validation
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, Dict
 from datetime import datetime
 
@@ -18,6 +18,9 @@ class RecalculateClientRequest(BaseModel):
 # Response Schemas
 
 class ValidationMessage(BaseModel):
+    # Accepts services.data_validator.ValidationMessage objects directly
+    model_config = ConfigDict(from_attributes=True)
+
     level: str  # 'error' | 'warning' | 'info'
     message: str
 
@@ -69,7 +72,7 @@ class UsageCalculationResponse(BaseModel):
     reorder_suggestion: Optional[ReorderSuggestion]
     financial_metrics: Optional[FinancialMetrics] = None
     validation_messages: List[ValidationMessage]
-    calculated_at: str  # ISO datetime
+    calculated_at: datetime
 
 class BatchCalculationResponse(BaseModel):
     client_id: str
@@ -80,7 +83,7 @@ class BatchCalculationResponse(BaseModel):
 
 class ClientRecalculationStatus(BaseModel):
     client_id: str
-    status: str  # 'started' | 'completed' | 'failed'
+    status: str  # 'started' | 'already_queued' | 'completed' | 'failed'
     message: str
     task_id: Optional[str]
 
@@ -89,6 +92,8 @@ class HealthCheckResponse(BaseModel):
     database_connected: bool
     version: str
     timestamp: str
+    db_latency_ms: Optional[float] = None
+    pool_status: Optional[str] = None  # Main connection pool pressure
 
 class StatsResponse(BaseModel):
     total_products: int
@@ -1,12 +1,16 @@
 """
 Data validation and quality checking for usage calculations
 """
+from collections import Counter
 from typing import Dict, List
+import numpy as np
 from models.database import Product
 from services.usage_calculator import UsageResult
 
 class ValidationMessage:
     """Validation message with severity level"""
+    __slots__ = ('level', 'message')
+
     def __init__(self, level: str, message: str):
         self.level = level  # 'error' | 'warning' | 'info'
         self.message = message
@@ -131,24 +135,45 @@ class DataValidator:
             Dictionary with validation summary
         """
         total_products = len(results)
-        products_with_errors = 0
-        products_with_warnings = 0
-        error_messages = []
-        warning_messages = []
-
-        for result, product in results:
-            messages = self.validate_usage_result(result, product)
-
-            has_error = any(m.level == 'error' for m in messages)
-            has_warning = any(m.level == 'warning' for m in messages)
-
-            if has_error:
-                products_with_errors += 1
-                error_messages.extend([m.message for m in messages if m.level == 'error'])
-
-            if has_warning:
-                products_with_warnings += 1
-                warning_messages.extend([m.message for m in messages if m.level == 'warning'])
+        error_counts = Counter()
+        warning_counts = Counter()
+
+        # Evaluate the error/warning rules as array masks; only flagged rows go
+        # through validate_usage_result to build their message strings
+        units = np.fromiter((r.monthly_usage_units for r, _ in results), dtype=np.float64, count=total_products)
+        packs = np.fromiter((r.monthly_usage_packs for r, _ in results), dtype=np.float64, count=total_products)
+        outliers = np.fromiter((r.outliers_detected for r, _ in results), dtype=np.int64, count=total_products)
+        days_stale = np.fromiter((r.days_since_last_data for r, _ in results), dtype=np.int64, count=total_products)
+        low_conf = np.fromiter((r.confidence_level == 'low' for r, _ in results), dtype=bool, count=total_products)
+        stock = np.fromiter((p.current_stock_units or 0 for _, p in results), dtype=np.float64, count=total_products)
+        notification = np.fromiter((p.notification_point or 0 for _, p in results), dtype=np.float64, count=total_products)
+
+        # Rule 1
+        has_error = units < 0
+
+        # Rule 5: implied weeks of usage at the notification point
+        has_notification = (notification != 0) & (packs > 0)
+        implied_weeks = np.divide(notification, packs, out=np.zeros_like(packs), where=has_notification) * 4.33
+
+        # Rules 2, 3, 4, 5, 8
+        has_warning = (
+            ((stock > 0) & (units > stock * 10)) |
+            low_conf |
+            (outliers > 2) |
+            (has_notification & ((implied_weeks < 1) | (implied_weeks > 26))) |
+            (days_stale > 90)
+        )
+
+        for i in np.flatnonzero(has_error | has_warning):
+            result, product = results[i]
+            for m in self.validate_usage_result(result, product):
+                if m.level == 'error':
+                    error_counts[m.message] += 1
+                elif m.level == 'warning':
+                    warning_counts[m.message] += 1
+
+        products_with_errors = int(has_error.sum())
+        products_with_warnings = int(has_warning.sum())
 
         return {
             'client_id': client_id,
@@ -157,6 +182,8 @@ class DataValidator:
             'products_with_warnings': products_with_warnings,
             'error_rate': products_with_errors / total_products if total_products > 0 else 0,
             'warning_rate': products_with_warnings / total_products if total_products > 0 else 0,
-            'top_errors': list(set(error_messages))[:5],
-            'top_warnings': list(set(warning_messages))[:5]
+            'top_errors': [message for message, _ in error_counts.most_common(5)],
+            'top_warnings': [message for message, _ in warning_counts.most_common(5)],
+            'top_error_counts': error_counts.most_common(5),
+            'top_warning_counts': warning_counts.most_common(5)
         }
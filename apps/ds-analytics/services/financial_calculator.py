@@ -2,12 +2,13 @@
 Financial Calculator Service
 Provides inventory cost and value calculations for DS Analytics
 """
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Sequence
 from dataclasses import dataclass
-from decimal import Decimal
+import math
+import numpy as np
 
 
-@dataclass
+@dataclass(slots=True)
 class FinancialMetrics:
     """Financial metrics for a product"""
     inventory_value: Optional[float] = None
@@ -40,6 +41,26 @@ class FinancialCalculator:
 
     DEFAULT_HOLDING_COST_RATE = 0.25  # 25% annual holding cost is industry standard
 
+    # Money is computed in integer cents and holding rates in basis points;
+    # results are converted back to float dollars at the boundary.
+    BASIS_POINTS = 10000
+
+    @staticmethod
+    def _to_cents(amount: float) -> int:
+        """Dollars -> integer cents"""
+        return int(round(amount * 100))
+
+    @staticmethod
+    def _to_basis_points(rate: float) -> int:
+        """Decimal rate -> integer basis points (0.25 -> 2500)"""
+        return int(round(rate * FinancialCalculator.BASIS_POINTS))
+
+    @staticmethod
+    def _div_round(numerator: int, denominator: int) -> int:
+        """Integer division rounding half away from zero"""
+        quotient = (abs(numerator) + denominator // 2) // denominator
+        return quotient if numerator >= 0 else -quotient
+
     @staticmethod
     def calculate_inventory_value(
         stock_units: int,
@@ -57,7 +78,7 @@ class FinancialCalculator:
         """
         if unit_cost is None or unit_cost <= 0:
             return None
-        return round(stock_units * unit_cost, 2)
+        return stock_units * FinancialCalculator._to_cents(unit_cost) / 100
 
     @staticmethod
     def calculate_holding_costs(
@@ -87,13 +108,16 @@ class FinancialCalculator:
             }
 
         rate = holding_cost_rate if holding_cost_rate else FinancialCalculator.DEFAULT_HOLDING_COST_RATE
-        inventory_value = stock_units * unit_cost
-        annual_cost = inventory_value * rate
+
+        # Annual cost in cents x basis points; each interval is rounded once from it
+        value_cents = stock_units * FinancialCalculator._to_cents(unit_cost)
+        annual_cost = value_cents * FinancialCalculator._to_basis_points(rate)
+        per_year = FinancialCalculator.BASIS_POINTS
 
         return {
-            "daily": round(annual_cost / 365, 2),
-            "monthly": round(annual_cost / 12, 2),
-            "annual": round(annual_cost, 2)
+            "daily": FinancialCalculator._div_round(annual_cost, per_year * 365) / 100,
+            "monthly": FinancialCalculator._div_round(annual_cost, per_year * 12) / 100,
+            "annual": FinancialCalculator._div_round(annual_cost, per_year) / 100
         }
 
     @staticmethod
@@ -121,8 +145,6 @@ class FinancialCalculator:
         Returns:
             Optimal order quantity or None if inputs invalid
         """
-        import math
-
         if any(v is None or v <= 0 for v in [annual_demand, order_cost, unit_cost]):
             return None
 
@@ -135,6 +157,42 @@ class FinancialCalculator:
         eoq = math.sqrt((2 * annual_demand * order_cost) / holding_cost_per_unit)
         return round(eoq, 0)
 
+    @staticmethod
+    def calculate_economic_order_quantity_batch(
+        annual_demand: Sequence[Optional[float]],
+        order_cost: Sequence[Optional[float]],
+        unit_cost: Sequence[Optional[float]],
+        holding_cost_rate: Optional[Sequence[Optional[float]]] = None
+    ) -> List[Optional[float]]:
+        """
+        Vectorized calculate_economic_order_quantity for what-if analyses.
+
+        Each argument is a per-scenario sequence (None where missing);
+        holding_cost_rate may be omitted to use the default rate throughout.
+
+        Returns:
+            List of optimal order quantities (None where inputs are invalid)
+        """
+        def as_array(values) -> np.ndarray:
+            return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+        demand = as_array(annual_demand)
+        order = as_array(order_cost)
+        cost = as_array(unit_cost)
+        if holding_cost_rate is None:
+            rate = np.full(len(demand), FinancialCalculator.DEFAULT_HOLDING_COST_RATE)
+        else:
+            rate = as_array(holding_cost_rate)
+            rate = np.where(np.isnan(rate) | (rate == 0), FinancialCalculator.DEFAULT_HOLDING_COST_RATE, rate)
+
+        holding_cost_per_unit = cost * rate
+        valid = (demand > 0) & (order > 0) & (cost > 0) & (holding_cost_per_unit > 0)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            eoq = np.sqrt((2 * demand * order) / holding_cost_per_unit)
+        eoq = np.where(valid, np.round(eoq), np.nan).tolist()
+        return [None if x != x else x for x in eoq]
+
     @staticmethod
     def calculate_stockout_risk_cost(
         days_until_stockout: Optional[int],
@@ -194,27 +252,97 @@ class FinancialCalculator:
         Returns:
             FinancialMetrics dataclass with all calculated values
         """
-        inventory_value = FinancialCalculator.calculate_inventory_value(
-            stock_units, unit_cost
-        )
-
-        holding_costs = FinancialCalculator.calculate_holding_costs(
-            stock_units, unit_cost, holding_cost_rate
-        )
-
-        stockout_risk = FinancialCalculator.calculate_stockout_risk_cost(
-            days_until_stockout,
-            daily_usage,
-            unit_price,
-            lead_time_days
-        )
-
-        return FinancialMetrics(
-            inventory_value=inventory_value,
-            daily_holding_cost=holding_costs["daily"],
-            monthly_holding_cost=holding_costs["monthly"],
-            annual_holding_cost=holding_costs["annual"],
-            reorder_cost=reorder_cost,
-            stockout_risk_cost=stockout_risk,
-            total_inventory_investment=inventory_value
-        )
+        # Single code path: a batch of one
+        return FinancialCalculator.calculate_full_metrics_batch(
+            stock_units=[stock_units],
+            unit_cost=[unit_cost],
+            unit_price=[unit_price],
+            holding_cost_rate=[holding_cost_rate],
+            reorder_cost=[reorder_cost],
+            days_until_stockout=[days_until_stockout],
+            daily_usage=[daily_usage],
+            lead_time_days=[lead_time_days]
+        )[0]
+
+    @staticmethod
+    def calculate_full_metrics_batch(
+        stock_units: Sequence[int],
+        unit_cost: Sequence[Optional[float]],
+        unit_price: Sequence[Optional[float]],
+        holding_cost_rate: Sequence[Optional[float]],
+        reorder_cost: Sequence[Optional[float]],
+        days_until_stockout: Sequence[Optional[int]],
+        daily_usage: Sequence[float],
+        lead_time_days: Sequence[int]
+    ) -> List[FinancialMetrics]:
+        """
+        Vectorized calculate_full_metrics for a batch of products.
+
+        Each argument is a per-product sequence (None where a value is missing)
+        or a numeric NumPy array / pandas Series (NaN where missing). Applies
+        the same rules as the scalar helpers with element-wise NumPy
+        operations instead of one Python call chain per product.
+
+        Returns:
+            List of FinancialMetrics, one per product, in input order
+        """
+        n = len(stock_units)
+        if n == 0:
+            return []
+
+        def as_array(values) -> np.ndarray:
+            if getattr(values, 'dtype', None) is not None and values.dtype.kind in 'fiu':
+                return np.asarray(values, dtype=np.float64)
+            return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+        stock = np.asarray(stock_units, dtype=np.int64)
+        cost = as_array(unit_cost)
+        price = as_array(unit_price)
+        rate = as_array(holding_cost_rate)
+        days_out = as_array(days_until_stockout)
+        reorder = as_array(reorder_cost).tolist()
+        usage = np.asarray(daily_usage, dtype=np.float64)
+        lead = np.asarray(lead_time_days, dtype=np.float64)
+
+        # Inventory value / holding costs: only for a known, positive unit cost
+        has_cost = cost > 0
+        cost_cents = np.rint(np.where(has_cost, cost, 0.0) * 100).astype(np.int64)
+        value_cents = stock * cost_cents
+
+        # Falsy rates (None / 0) fall back to the default, as in calculate_holding_costs
+        rate = np.where(np.isnan(rate) | (rate == 0), FinancialCalculator.DEFAULT_HOLDING_COST_RATE, rate)
+        rate_bp = np.rint(rate * FinancialCalculator.BASIS_POINTS).astype(np.int64)
+        annual_cost = value_cents * rate_bp
+        per_year = FinancialCalculator.BASIS_POINTS
+
+        def div_round(numerator: np.ndarray, denominator: int) -> np.ndarray:
+            return np.sign(numerator) * ((np.abs(numerator) + denominator // 2) // denominator)
+
+        # Stockout risk: needs a prediction and a positive price; zero unless stockout precedes lead time
+        has_risk = ~np.isnan(days_out) & (price > 0)
+        stockout_risk = np.where(days_out < lead, usage * (lead - days_out) * price, 0.0)
+
+        # NaN marks "not available"
+        inventory_value = np.where(has_cost, value_cents / 100, np.nan).tolist()
+        daily = np.where(has_cost, div_round(annual_cost, per_year * 365) / 100, np.nan).tolist()
+        monthly = np.where(has_cost, div_round(annual_cost, per_year * 12) / 100, np.nan).tolist()
+        annual = np.where(has_cost, div_round(annual_cost, per_year) / 100, np.nan).tolist()
+        # Stockout risk stays float (fractional daily usage); rounding happens on
+        # the Python floats so it matches the scalar helper (np.round differs on ties)
+        stockout_risk = [None if x != x else round(x, 2) for x in np.where(has_risk, stockout_risk, np.nan).tolist()]
+
+        def value(x: float) -> Optional[float]:
+            return None if x != x else x
+
+        return [
+            FinancialMetrics(
+                inventory_value=value(inventory_value[i]),
+                daily_holding_cost=value(daily[i]),
+                monthly_holding_cost=value(monthly[i]),
+                annual_holding_cost=value(annual[i]),
+                reorder_cost=value(reorder[i]),
+                stockout_risk_cost=stockout_risk[i],
+                total_inventory_investment=value(inventory_value[i])
+            )
+            for i in range(n)
+        ]
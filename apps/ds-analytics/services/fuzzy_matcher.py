@@ -8,13 +8,145 @@ This service handles 85-90% of product matches without any API costs,
 only falling back to Claude AI for the hardest 10-15% of cases.
 """
 
-from typing import List, Dict, Optional, Tuple
-from rapidfuzz import fuzz, distance
+from typing import List, Dict, Optional, Tuple, Union, FrozenSet
+from rapidfuzz import fuzz, distance, process
+from cachetools import LRUCache
+from functools import lru_cache
+from itertools import count
+from threading import Lock
+import heapq
+import numpy as np
 import re
-from dataclasses import dataclass
+from dataclasses import dataclass, field, fields
+
+
+_SKU_PREFIX_RE = re.compile(r'^(SKU|PROD|ITEM|P|PRODUCT)-?', re.IGNORECASE)
+_SKU_SEPARATOR_RE = re.compile(r'[-_\s]')
+
+
+@lru_cache(maxsize=131072)
+def normalize_sku(sku: str) -> str:
+    """
+    Normalize SKU/product ID for comparison.
+
+    Removes common prefixes, separators, and standardizes format.
+    Memoized: candidate catalogs repeat the same SKUs across requests.
+    Examples:
+        "SKU-123" → "123"
+        "PROD_ABC" → "ABC"
+        "P-123-ABC" → "123ABC"
+    """
+    if not sku:
+        return ""
+
+    # Remove common prefixes
+    normalized = _SKU_PREFIX_RE.sub('', sku)
+
+    # Remove separators and whitespace
+    normalized = _SKU_SEPARATOR_RE.sub('', normalized)
+
+    # Uppercase for comparison
+    return normalized.upper()
+
+
+def is_multi_token(sku: str) -> bool:
+    """Whether a SKU has hyphen or space separated parts (token scorers add signal only then)."""
+    return '-' in sku or ' ' in sku
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    """Character trigrams of a lower-cased string (empty for strings under 3 chars)."""
+    text = text.lower()
+    return frozenset(text[i:i + 3] for i in range(len(text) - 2))
+
+
+# Reasoning phrases per field for score buckets 0 (< 0.75), 1 (>= 0.75), 2 (>= 0.90)
+_PRODUCT_ID_REASONS = (
+    None,
+    "Similar product IDs with minor differences",
+    "Very similar product IDs ('{orphan_id}' ≈ '{candidate_id}')"
+)
+_NAME_REASONS = (None, "Similar product names", "Nearly identical product names")
+_VENDOR_REASONS = (None, "Similar vendor information", "Same vendor")
+
+# Every (product_id, name, vendor) bucket combination -> reasoning text
+_REASONING_TABLE = {
+    (pid, name, vendor): "; ".join(
+        reason for reason in (_PRODUCT_ID_REASONS[pid], _NAME_REASONS[name], _VENDOR_REASONS[vendor]) if reason
+    ) or "Moderate similarity across multiple fields"
+    for pid in range(3) for name in range(3) for vendor in range(3)
+}
+
+
+def _reason_bucket(score: float) -> int:
+    """Reasoning bucket for a field score."""
+    return 2 if score >= 0.90 else 1 if score >= 0.75 else 0
+
+
+_index_versions = count()
 
 
 @dataclass
+class CandidateIndex:
+    """
+    Candidate list prepared once for repeated matching.
+
+    Holds the candidate fields as parallel lists (missing values as '') plus
+    everything match_product would otherwise derive from them per orphan:
+    normalized SKUs, upper-cased product IDs and vendor codes, lower-cased
+    and case-folded names, presence masks and the multi-token SKU mask. When built with the prefilter it also holds the
+    SKU/name trigram sets it compares and exact-match lookups by normalized
+    SKU and case-folded name.
+
+    Each index gets a fresh version number; match_product caches results per
+    (index version, orphan), so rebuilding the index invalidates them.
+    """
+
+    candidate_ids: List[Optional[str]]
+    candidate_product_ids: List[str]
+    product_ids: List[str]
+    names: List[str]
+    vendor_codes: List[str]
+    vendor_names: List[str]
+    norm_product_ids: List[str]
+    upper_product_ids: List[str]
+    upper_vendor_codes: List[str]
+    vendor_code_keys: List[str]  # vendorCode.upper().strip(), for exact matching
+    lower_names: List[str]
+    name_keys: List[str]  # name.strip().lower(), for exact matching
+    has_product_id: np.ndarray
+    has_norm_product_id: np.ndarray
+    has_name: np.ndarray
+    has_vendor_code: np.ndarray
+    has_vendor_name: np.ndarray
+    multi_token: np.ndarray  # product ID is hyphen/space separated
+    sku_trigrams: Optional[List[FrozenSet[str]]] = None
+    name_trigrams: Optional[List[FrozenSet[str]]] = None
+    sku_positions: Optional[Dict[str, List[int]]] = None
+    name_positions: Optional[Dict[str, List[int]]] = None
+    version: int = field(default_factory=lambda: next(_index_versions))
+
+    def __len__(self) -> int:
+        return len(self.candidate_ids)
+
+    def subset(self, indices: List[int]) -> 'CandidateIndex':
+        """Index restricted to the given candidate positions (without exact-match lookups)."""
+        positions = np.asarray(indices, dtype=np.intp)
+        subset = {}
+        for index_field in fields(self):
+            if index_field.name == 'version':
+                continue
+            values = getattr(self, index_field.name)
+            if values is None or isinstance(values, dict):
+                subset[index_field.name] = None
+            elif isinstance(values, np.ndarray):
+                subset[index_field.name] = values[positions]
+            else:
+                subset[index_field.name] = [values[i] for i in indices]
+        return CandidateIndex(**subset)
+
+
+@dataclass(slots=True)
 class FuzzyMatch:
     """Represents a fuzzy match candidate with confidence score."""
 
@@ -49,33 +181,21 @@ class FuzzyMatcher:
     NAME_WEIGHT = 0.35  # Product name
     VENDOR_WEIGHT = 0.15  # Vendor fields
 
+    # Candidates whose trigram overlap with the orphan is below this on both
+    # the SKU and the name are skipped before fuzzy scoring
+    PREFILTER_MIN_OVERLAP = 0.15
+
+    # Cached match_product results for prepared candidate indexes
+    MATCH_CACHE_SIZE = 10000
+
     def __init__(self):
         """Initialize the fuzzy matcher."""
-        pass
+        self._match_cache = LRUCache(maxsize=self.MATCH_CACHE_SIZE)
+        self._match_cache_lock = Lock()
 
     def normalize_sku(self, sku: str) -> str:
-        """
-        Normalize SKU/product ID for comparison.
-
-        Removes common prefixes, separators, and standardizes format.
-        Examples:
-            "SKU-123" → "123"
-            "PROD_ABC" → "ABC"
-            "P-123-ABC" → "123ABC"
-        """
-        if not sku:
-            return ""
-
-        # Remove common prefixes
-        normalized = re.sub(r'^(SKU|PROD|ITEM|P|PRODUCT)-?', '', sku, flags=re.IGNORECASE)
-
-        # Remove separators and whitespace
-        normalized = re.sub(r'[-_\s]', '', normalized)
-
-        # Uppercase for comparison
-        normalized = normalized.upper()
-
-        return normalized
+        """Normalize SKU/product ID for comparison (see module-level normalize_sku)."""
+        return normalize_sku(sku)
 
     def exact_match(
         self,
@@ -135,6 +255,11 @@ class FuzzyMatcher:
                 orphan_product_id.upper(), candidate_product_id.upper()
             )
 
+        # Single-token SKUs on both sides: token_sort degenerates to an edit
+        # ratio and partial adds little over Levenshtein/Jaro-Winkler
+        if not is_multi_token(orphan_product_id) and not is_multi_token(candidate_product_id):
+            return scores
+
         # Token sort ratio (handles different ordering: "ABC-123" vs "123-ABC")
         scores['token_sort'] = fuzz.token_sort_ratio(
             orphan_product_id, candidate_product_id
@@ -200,11 +325,13 @@ class FuzzyMatcher:
 
         # Vendor code exact match
         if orphan_vendor_code and candidate_vendor_code:
-            if orphan_vendor_code.strip().upper() == candidate_vendor_code.strip().upper():
+            orphan_code = orphan_vendor_code.upper()
+            candidate_code = candidate_vendor_code.upper()
+            if orphan_code.strip() == candidate_code.strip():
                 scores['vendor_code_exact'] = 1.0
             else:
                 scores['vendor_code_levenshtein'] = 1 - distance.Levenshtein.normalized_distance(
-                    orphan_vendor_code.upper(), candidate_vendor_code.upper()
+                    orphan_code, candidate_code
                 )
 
         # Vendor name matching
@@ -228,16 +355,11 @@ class FuzzyMatcher:
         the contribution of each field type.
         """
         # Aggregate scores by field (take max of each field's algorithms)
-        product_id_score = max(product_id_scores.values()) if product_id_scores else 0.0
-        name_score = max(name_scores.values()) if name_scores else 0.0
-        vendor_score = max(vendor_scores.values()) if vendor_scores else 0.0
+        product_id_score = max(product_id_scores.values(), default=0.0)
+        name_score = max(name_scores.values(), default=0.0)
+        vendor_score = max(vendor_scores.values(), default=0.0)
 
-        # Calculate weighted combination
-        combined = (
-            product_id_score * self.PRODUCT_ID_WEIGHT +
-            name_score * self.NAME_WEIGHT +
-            vendor_score * self.VENDOR_WEIGHT
-        )
+        combined = self.weighted_score(product_id_score, name_score, vendor_score)
 
         field_scores = {
             'product_id': product_id_score,
@@ -247,6 +369,23 @@ class FuzzyMatcher:
 
         return combined, field_scores
 
+    def weighted_score(
+        self,
+        product_id_score: Union[float, np.ndarray],
+        name_score: Union[float, np.ndarray],
+        vendor_score: Union[float, np.ndarray]
+    ) -> Union[float, np.ndarray]:
+        """
+        Weighted combination of per-field scores.
+
+        Pure arithmetic on floats or NumPy arrays of field maxima.
+        """
+        return (
+            product_id_score * self.PRODUCT_ID_WEIGHT +
+            name_score * self.NAME_WEIGHT +
+            vendor_score * self.VENDOR_WEIGHT
+        )
+
     def generate_reasoning(
         self,
         orphan_product_id: str,
@@ -259,35 +398,75 @@ class FuzzyMatcher:
 
         Returns a string explaining why these products matched.
         """
-        reasons = []
-
-        # Product ID matching
-        if field_scores['product_id'] >= 0.90:
-            reasons.append(f"Very similar product IDs ('{orphan_product_id}' ≈ '{candidate_product_id}')")
-        elif field_scores['product_id'] >= 0.75:
-            reasons.append(f"Similar product IDs with minor differences")
-
-        # Name matching
-        if field_scores['name'] >= 0.90:
-            reasons.append("Nearly identical product names")
-        elif field_scores['name'] >= 0.75:
-            reasons.append("Similar product names")
-
-        # Vendor matching
-        if field_scores['vendor'] >= 0.90:
-            reasons.append("Same vendor")
-        elif field_scores['vendor'] >= 0.75:
-            reasons.append("Similar vendor information")
+        key = (
+            _reason_bucket(field_scores['product_id']),
+            _reason_bucket(field_scores['name']),
+            _reason_bucket(field_scores['vendor'])
+        )
+        reasoning = _REASONING_TABLE[key]
+        if key[0] == 2:
+            return reasoning.format(orphan_id=orphan_product_id, candidate_id=candidate_product_id)
+        return reasoning
 
-        if not reasons:
-            reasons.append("Moderate similarity across multiple fields")
+    def build_index(self, candidates: List[Dict], prefilter: bool = True) -> CandidateIndex:
+        """
+        Prepare a candidate list for matching.
 
-        return "; ".join(reasons)
+        Callers matching several orphans against the same candidates should
+        build the index once and pass it to match_product. With prefilter,
+        the trigram sets are built too so match_product can skip candidates
+        with no SKU or name overlap before fuzzy scoring; building them costs
+        more than it saves for a single orphan.
+        """
+        product_ids = [c.get('productId', '') or '' for c in candidates]
+        names = [c.get('name') or '' for c in candidates]
+        vendor_codes = [c.get('vendorCode') or '' for c in candidates]
+        vendor_names = [c.get('vendorName') or '' for c in candidates]
+        norm_product_ids = [normalize_sku(pid) for pid in product_ids]
+        upper_vendor_codes = [code.upper() for code in vendor_codes]
+        lower_names = [name.lower() for name in names]
+        name_keys = [name.strip() for name in lower_names]
+
+        sku_positions = name_positions = None
+        if prefilter:
+            sku_positions, name_positions = {}, {}
+            for i, (norm_pid, name, name_key) in enumerate(zip(norm_product_ids, names, name_keys)):
+                if norm_pid:
+                    sku_positions.setdefault(norm_pid, []).append(i)
+                if name:
+                    name_positions.setdefault(name_key, []).append(i)
+
+        return CandidateIndex(
+            candidate_ids=[c.get('id') for c in candidates],
+            candidate_product_ids=[c.get('productId', '') for c in candidates],
+            product_ids=product_ids,
+            names=names,
+            vendor_codes=vendor_codes,
+            vendor_names=vendor_names,
+            norm_product_ids=norm_product_ids,
+            upper_product_ids=[pid.upper() for pid in product_ids],
+            upper_vendor_codes=upper_vendor_codes,
+            vendor_code_keys=[code.strip() for code in upper_vendor_codes],
+            lower_names=lower_names,
+            name_keys=name_keys,
+            has_product_id=self._present(product_ids),
+            has_norm_product_id=self._present(norm_product_ids),
+            has_name=self._present(names),
+            has_vendor_code=self._present(vendor_codes),
+            has_vendor_name=self._present(vendor_names),
+            multi_token=np.array([is_multi_token(pid) for pid in product_ids], dtype=bool),
+            sku_trigrams=[
+                trigrams(pid) | trigrams(norm) for pid, norm in zip(product_ids, norm_product_ids)
+            ] if prefilter else None,
+            name_trigrams=[trigrams(name) for name in names] if prefilter else None,
+            sku_positions=sku_positions,
+            name_positions=name_positions
+        )
 
     def match_product(
         self,
         orphan: Dict,
-        candidates: List[Dict],
+        candidates: Union[List[Dict], CandidateIndex],
         max_results: int = 3
     ) -> List[FuzzyMatch]:
         """
@@ -295,74 +474,276 @@ class FuzzyMatcher:
 
         Args:
             orphan: Dict with keys: id, productId, name, vendorCode, vendorName
-            candidates: List of dicts with same structure
+            candidates: List of dicts with same structure, or a CandidateIndex
+                from build_index
             max_results: Maximum number of matches to return
 
         Returns:
-            List of FuzzyMatch objects sorted by confidence (highest first)
+            List of FuzzyMatch objects sorted by confidence (highest first).
+            Results for a CandidateIndex are memoized per orphan signature, so
+            repeat lookups share the FuzzyMatch objects.
+        """
+        if not candidates:
+            return []
+
+        if not isinstance(candidates, CandidateIndex):
+            return self._match_one(orphan, self.build_index(candidates, prefilter=False), max_results)
+
+        key = (
+            candidates.version,
+            orphan.get('productId', ''),
+            orphan.get('name'),
+            orphan.get('vendorCode'),
+            orphan.get('vendorName'),
+            max_results
+        )
+        with self._match_cache_lock:
+            matches = self._match_cache.get(key)
+        if matches is None:
+            matches = self._match_one(orphan, candidates, max_results)
+            with self._match_cache_lock:
+                self._match_cache[key] = matches
+        return list(matches)
+
+    def _match_one(self, orphan: Dict, index: CandidateIndex, max_results: int) -> List[FuzzyMatch]:
+        """Uncached match_product against a prepared index."""
+        exact = self._exact_matches(orphan, index)
+
+        # Enough exact matches: nothing after the last one needed can rank
+        cutoff = self._exact_cutoff(exact, max_results)
+        if cutoff is not None and cutoff < len(index):
+            index = index.subset(list(range(cutoff)))
+            exact = exact[:cutoff]
+
+        # Cheap prefilter (prepared indexes only): only candidates with some
+        # SKU or name trigram overlap (or an exact match) go on to full scoring
+        if index.sku_trigrams is not None:
+            survivors = self._prefilter(index, orphan.get('productId', ''), orphan.get('name'), exact)
+            if not survivors:
+                return []
+            if len(survivors) < len(index):
+                index = index.subset(survivors)
+                exact = [exact[i] for i in survivors]
+
+        return self._rank_matches([orphan], index, [exact], max_results)[0]
+
+    def match_batch(
+        self,
+        orphans: List[Dict],
+        candidates: Union[List[Dict], CandidateIndex],
+        max_results: int = 3
+    ) -> List[List[FuzzyMatch]]:
+        """
+        Find fuzzy matches for several orphan products at once.
+
+        Scores all orphans against all candidates with one rapidfuzz cdist
+        call per algorithm (parallelized across orphans). Every candidate is
+        scored, so no trigram prefilter is applied.
+
+        Returns:
+            One list of FuzzyMatch objects per orphan, in orphan order, each as
+            match_product would return it without the prefilter
+        """
+        if not orphans:
+            return []
+        if not candidates:
+            return [[] for _ in orphans]
+
+        if isinstance(candidates, CandidateIndex):
+            index = candidates
+        else:
+            index = self.build_index(candidates, prefilter=False)
+
+        exact = [self._exact_matches(orphan, index) for orphan in orphans]
+
+        # Columns past every orphan's exact-match cutoff can't rank for any row
+        cutoffs = [self._exact_cutoff(row, max_results) for row in exact]
+        if None not in cutoffs and max(cutoffs) < len(index):
+            cutoff = max(cutoffs)
+            index = index.subset(list(range(cutoff)))
+            exact = [row[:cutoff] for row in exact]
+
+        return self._rank_matches(orphans, index, exact, max_results)
+
+    @staticmethod
+    def _exact_cutoff(exact: List[bool], max_results: int) -> Optional[int]:
+        """
+        Number of leading candidates that decide the top max_results, if exact
+        matches alone fill it.
+
+        Exact matches score 1.0 and ties rank in candidate order, so nothing
+        after the max_results-th exact match can make the cut. None when there
+        are fewer exact matches than that.
         """
-        matches = []
+        if max_results < 1:
+            return None
+        found = 0
+        for i, is_exact in enumerate(exact):
+            if is_exact:
+                found += 1
+                if found == max_results:
+                    return i + 1
+        return None
 
+    def _exact_matches(self, orphan: Dict, index: CandidateIndex) -> List[bool]:
+        """Exact match flags per candidate (normalized product ID or case-insensitive name)."""
         orphan_product_id = orphan.get('productId', '')
         orphan_name = orphan.get('name')
-        orphan_vendor_code = orphan.get('vendorCode')
-        orphan_vendor_name = orphan.get('vendorName')
-
-        for candidate in candidates:
-            candidate_id = candidate.get('id')
-            candidate_product_id = candidate.get('productId', '')
-            candidate_name = candidate.get('name')
-            candidate_vendor_code = candidate.get('vendorCode')
-            candidate_vendor_name = candidate.get('vendorName')
-
-            # Check for exact match first
-            exact = self.exact_match(
-                orphan_product_id, orphan_name,
-                candidate_product_id, candidate_name
+        norm_orphan = normalize_sku(orphan_product_id) if orphan_product_id else ''
+        orphan_name_key = orphan_name.strip().lower() if orphan_name else None
+
+        if index.sku_positions is not None:
+            exact = [False] * len(index)
+            for i in index.sku_positions.get(norm_orphan, []) if norm_orphan else []:
+                exact[i] = True
+            for i in index.name_positions.get(orphan_name_key, []) if orphan_name else []:
+                exact[i] = True
+            return exact
+
+        return [
+            bool(norm_orphan and norm_pid and norm_pid == norm_orphan)
+            or bool(orphan_name and name and name_key == orphan_name_key)
+            for norm_pid, name, name_key in zip(index.norm_product_ids, index.names, index.name_keys)
+        ]
+
+    def _rank_matches(
+        self,
+        orphans: List[Dict],
+        index: CandidateIndex,
+        exact: List[List[bool]],
+        max_results: int
+    ) -> List[List[FuzzyMatch]]:
+        """Score orphans (rows) against index candidates (columns) and keep each row's top matches."""
+        orphan_product_ids = [o.get('productId', '') or '' for o in orphans]
+        orphan_names = [o.get('name') or '' for o in orphans]
+        orphan_vendor_codes = [o.get('vendorCode') or '' for o in orphans]
+        orphan_vendor_names = [o.get('vendorName') or '' for o in orphans]
+        norm_orphans = [normalize_sku(pid) for pid in orphan_product_ids]
+
+        product_ids = index.product_ids
+        names = index.names
+        vendor_names = index.vendor_names
+        norm_product_ids = index.norm_product_ids
+        shape = (len(orphans), len(index))
+        is_exact = np.array(exact, dtype=bool).reshape(shape)
+
+        has_product_id = self._present(orphan_product_ids)[:, None] & index.has_product_id
+        has_name = self._present(orphan_names)[:, None] & index.has_name
+
+        # Product ID scores: one cdist call per scorer over all pairs.
+        # Each entry is (scores, applies) where applies masks the pairs
+        # the algorithm is defined for.
+        product_id_scores = {}
+        if has_product_id.any():
+            has_norm = has_product_id & self._present(norm_orphans)[:, None] & index.has_norm_product_id
+            product_id_scores['levenshtein'] = (
+                self._score_matrix(norm_orphans, norm_product_ids, distance.Levenshtein.normalized_similarity),
+                has_norm
             )
-
-            if exact == 1.0:
-                matches.append(FuzzyMatch(
-                    candidate_id=candidate_id,
-                    candidate_product_id=candidate_product_id,
-                    candidate_name=candidate_name or '',
-                    confidence_score=1.0,
-                    match_method='exact',
-                    score_breakdown={'exact': 1.0},
-                    reasoning=f"Exact match on product ID or name"
-                ))
-                continue
-
-            # Calculate fuzzy similarity scores
-            product_id_scores = self.product_id_similarity(
-                orphan_product_id, candidate_product_id
+            product_id_scores['jaro_winkler'] = (
+                self._score_matrix([p.upper() for p in orphan_product_ids], index.upper_product_ids,
+                                   distance.JaroWinkler.normalized_similarity),
+                has_product_id
             )
-
-            name_scores = self.name_similarity(
-                orphan_name, candidate_name
+            # Token scorers only where either SKU is multi-token
+            multi_token = has_product_id & (
+                np.array([is_multi_token(p) for p in orphan_product_ids])[:, None]
+                | index.multi_token
             )
+            if multi_token.any():
+                product_id_scores['token_sort'] = (
+                    self._score_columns(orphan_product_ids, product_ids, fuzz.token_sort_ratio, multi_token) / 100.0,
+                    multi_token
+                )
+                product_id_scores['partial'] = (
+                    self._score_columns(orphan_product_ids, product_ids, fuzz.partial_ratio, multi_token) / 100.0,
+                    multi_token
+                )
 
-            vendor_scores = self.vendor_similarity(
-                orphan_vendor_code, orphan_vendor_name,
-                candidate_vendor_code, candidate_vendor_name
+        # Name scores
+        name_scores = {}
+        if has_name.any():
+            name_scores['levenshtein'] = (
+                self._score_matrix([name.lower() for name in orphan_names], index.lower_names,
+                                   distance.Levenshtein.normalized_similarity),
+                has_name
+            )
+            name_scores['token_set'] = (
+                self._score_matrix(orphan_names, names, fuzz.token_set_ratio) / 100.0, has_name
+            )
+            name_scores['token_sort'] = (
+                self._score_matrix(orphan_names, names, fuzz.token_sort_ratio) / 100.0, has_name
+            )
+            name_scores['partial'] = (
+                self._score_matrix(orphan_names, names, fuzz.partial_ratio) / 100.0, has_name
             )
 
-            # Compute combined confidence score
-            combined_score, field_scores = self.compute_combined_score(
-                product_id_scores, name_scores, vendor_scores
+        # Vendor scores
+        vendor_scores = {}
+        has_code = self._present(orphan_vendor_codes)[:, None] & index.has_vendor_code
+        if has_code.any():
+            orphan_codes = [code.upper() for code in orphan_vendor_codes]
+            orphan_code_keys = np.array([code.strip() for code in orphan_codes], dtype=object)
+            code_exact = has_code & (orphan_code_keys[:, None] == np.array(index.vendor_code_keys, dtype=object))
+            vendor_scores['vendor_code_exact'] = (np.ones(shape), code_exact)
+            vendor_scores['vendor_code_levenshtein'] = (
+                self._score_matrix(orphan_codes, index.upper_vendor_codes,
+                                   distance.Levenshtein.normalized_similarity),
+                has_code & ~code_exact
+            )
+        has_vendor_name = self._present(orphan_vendor_names)[:, None] & index.has_vendor_name
+        if has_vendor_name.any():
+            vendor_scores['vendor_name_token'] = (
+                self._score_matrix(orphan_vendor_names, vendor_names, fuzz.token_set_ratio) / 100.0,
+                has_vendor_name
             )
 
-            # Only include matches above minimum threshold
-            if combined_score >= self.MINIMUM_THRESHOLD:
+        # Per-field score = max over that field's applicable algorithms (0 if none apply)
+        product_id_field = self._field_max(product_id_scores, shape)
+        name_field = self._field_max(name_scores, shape)
+        vendor_field = self._field_max(vendor_scores, shape)
+
+        combined = self.weighted_score(product_id_field, name_field, vendor_field)
+
+        results = []
+        for k, orphan in enumerate(orphans):
+            # Top max_results by reported (rounded) confidence; nlargest keeps
+            # candidate order on ties, like a stable sort. Only the kept rows
+            # become FuzzyMatch objects.
+            row = combined[k]
+            flagged = np.flatnonzero(is_exact[k] | (row >= self.MINIMUM_THRESHOLD))
+            confidence = {i: 1.0 if is_exact[k, i] else round(float(row[i]), 4) for i in flagged.tolist()}
+            ranked = heapq.nlargest(max_results, confidence, key=confidence.get)
+
+            matches = []
+            for i in ranked:
+                if is_exact[k, i]:
+                    matches.append(FuzzyMatch(
+                        candidate_id=index.candidate_ids[i],
+                        candidate_product_id=index.candidate_product_ids[i],
+                        candidate_name=names[i],
+                        confidence_score=1.0,
+                        match_method='exact',
+                        score_breakdown={'exact': 1.0},
+                        reasoning=f"Exact match on product ID or name"
+                    ))
+                    continue
+
+                combined_score = float(row[i])
+                field_scores = {
+                    'product_id': float(product_id_field[k, i]),
+                    'name': float(name_field[k, i]),
+                    'vendor': float(vendor_field[k, i])
+                }
                 all_scores = {
-                    'product_id': product_id_scores,
-                    'name': name_scores,
-                    'vendor': vendor_scores
+                    'product_id': self._pair_scores(product_id_scores, k, i),
+                    'name': self._pair_scores(name_scores, k, i),
+                    'vendor': self._pair_scores(vendor_scores, k, i)
                 }
 
                 reasoning = self.generate_reasoning(
-                    orphan_product_id,
-                    candidate_product_id,
+                    orphan.get('productId', ''),
+                    index.candidate_product_ids[i],
                     field_scores,
                     all_scores
                 )
@@ -376,20 +757,83 @@ class FuzzyMatcher:
                     method = 'fuzzy_combined'
 
                 matches.append(FuzzyMatch(
-                    candidate_id=candidate_id,
-                    candidate_product_id=candidate_product_id,
-                    candidate_name=candidate_name or '',
-                    confidence_score=round(combined_score, 4),
+                    candidate_id=index.candidate_ids[i],
+                    candidate_product_id=index.candidate_product_ids[i],
+                    candidate_name=names[i],
+                    confidence_score=confidence[i],
                     match_method=method,
                     score_breakdown={
                         **field_scores,
-                        **product_id_scores,
-                        **name_scores,
-                        **vendor_scores
+                        **all_scores['product_id'],
+                        **all_scores['name'],
+                        **all_scores['vendor']
                     },
                     reasoning=reasoning
                 ))
 
-        # Sort by confidence score (highest first) and return top N
-        matches.sort(key=lambda m: m.confidence_score, reverse=True)
-        return matches[:max_results]
+            results.append(matches)
+
+        return results
+
+    def _prefilter(
+        self,
+        index: CandidateIndex,
+        orphan_product_id: Optional[str],
+        orphan_name: Optional[str],
+        exact: List[bool]
+    ) -> List[int]:
+        """Positions of candidates worth full scoring: exact matches or enough SKU/name trigram overlap."""
+        orphan_sku_trigrams = trigrams(orphan_product_id or '') | trigrams(normalize_sku(orphan_product_id or ''))
+        orphan_name_trigrams = trigrams(orphan_name or '')
+        if not orphan_sku_trigrams and not orphan_name_trigrams:
+            return list(range(len(index)))
+
+        threshold = self.PREFILTER_MIN_OVERLAP
+        return [
+            i for i, (sku_trigrams, name_trigrams) in enumerate(zip(index.sku_trigrams, index.name_trigrams))
+            if exact[i]
+            or self._trigram_overlap(orphan_sku_trigrams, sku_trigrams) >= threshold
+            or self._trigram_overlap(orphan_name_trigrams, name_trigrams) >= threshold
+        ]
+
+    @staticmethod
+    def _trigram_overlap(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+        """Trigram overlap coefficient (1.0 when either string is too short to compare)."""
+        if not a or not b:
+            return 1.0
+        return len(a & b) / min(len(a), len(b))
+
+    @staticmethod
+    def _present(values: List[str]) -> np.ndarray:
+        """Boolean mask of non-empty values."""
+        return np.array([bool(value) for value in values], dtype=bool)
+
+    @staticmethod
+    def _score_matrix(queries: List[str], choices: List[str], scorer) -> np.ndarray:
+        """Score every query against every choice in a single rapidfuzz cdist call."""
+        workers = -1 if len(queries) > 1 else 1
+        return process.cdist(queries, choices, scorer=scorer, dtype=np.float64, workers=workers)
+
+    @classmethod
+    def _score_columns(cls, queries: List[str], choices: List[str], scorer, applies: np.ndarray) -> np.ndarray:
+        """Like _score_matrix, but only scores choices some query applies to (others left at 0)."""
+        columns = np.flatnonzero(applies.any(axis=0))
+        if len(columns) == len(choices):
+            return cls._score_matrix(queries, choices, scorer)
+        scores = np.zeros(applies.shape)
+        scores[:, columns] = cls._score_matrix(queries, [choices[i] for i in columns], scorer)
+        return scores
+
+    @staticmethod
+    def _field_max(scores: Dict[str, Tuple[np.ndarray, np.ndarray]], shape: Tuple[int, int]) -> np.ndarray:
+        """Max over a field's algorithm scores, counting only pairs each one applies to."""
+        field = np.full(shape, -np.inf)
+        for values, applies in scores.values():
+            np.maximum(field, np.where(applies, values, -np.inf), out=field)
+        field[np.isneginf(field)] = 0.0
+        return field
+
+    @staticmethod
+    def _pair_scores(scores: Dict[str, Tuple[np.ndarray, np.ndarray]], k: int, i: int) -> Dict[str, float]:
+        """Per-algorithm scores for orphan k and candidate i, limited to the algorithms that apply."""
+        return {name: float(values[k, i]) for name, (values, applies) in scores.items() if applies[k, i]}
@@ -1,29 +1,42 @@
 """
 Core usage calculation engine with multiple methods and confidence scoring
 """
-from dataclasses import dataclass
-from datetime import datetime, timedelta, timezone
-from typing import Optional, List, Dict
-import pandas as pd
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Optional, List, Dict, Union
+from cachetools import TTLCache
 import numpy as np
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import Row, text
 
-from models.database import Product, Transaction, StockHistory, ClientConfiguration
 from utils.statistical import (
-    calculate_weeks_remaining,
-    classify_stock_status,
     calculate_usage_velocity_trend,
-    detect_outliers_iqr,
     detect_seasonality,
-    calculate_coefficient_of_variation,
-    generate_time_weights,
-    predict_stockout_date,
-    calculate_reorder_quantity
+    dispersion_stats,
+    generate_time_weights
 )
 from utils.confidence import ConfidenceCalculator
 
-@dataclass
+def _as_utc(timestamp: datetime) -> datetime:
+    """Timezone-aware timestamp; naive database timestamps are UTC."""
+    if timestamp.tzinfo is None:
+        return timestamp.replace(tzinfo=timezone.utc)
+    return timestamp
+
+# Calculated results per (product_id, client_id), shared by every calculator in
+# the process and reused while the product's freshness key (pack size,
+# notification point and a fingerprint of its completed orders and snapshots)
+# is unchanged. The TTL bounds drift in recency-based confidence and in client
+# configuration, which the key does not cover. Entries are private copies:
+# results go in and come out through _copy_result, so callers never share one.
+RESULT_CACHE_SIZE = 4096
+RESULT_CACHE_TTL_SECONDS = 3600
+_result_cache = TTLCache(maxsize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL_SECONDS)
+_result_cache_lock = Lock()
+
+
+@dataclass(slots=True)
 class UsageResult:
     """Result from usage calculation"""
     product_id: str
@@ -40,6 +53,13 @@ class UsageResult:
     variance: float = 0.0
     cv: float = 0.0
     days_since_last_data: int = 0
+    # Monthly completed-order unit totals (oldest first) behind an order-based result
+    monthly_history: Optional[np.ndarray] = field(default=None, repr=False, compare=False)
+
+def _copy_result(result: UsageResult) -> UsageResult:
+    """Copy of a result (monthly history included) that shares no mutable state with it."""
+    history = result.monthly_history
+    return replace(result, monthly_history=None if history is None else history.copy())
 
 class UsageCalculator:
     """
@@ -50,39 +70,175 @@ class UsageCalculator:
     4. Statistical estimation based on notification points
     """
 
+    # Fixed confidence of the notification-point estimate
+    ESTIMATED_CONFIDENCE = 0.3
+
     def __init__(self, db: Session):
         self.db = db
         self.confidence_calc = ConfidenceCalculator()
+        # Product ID -> (pack_size, notification_point) row, or None when the
+        # product does not exist; product fields are static within a calculation run
+        self._product_cache: Dict[str, Optional[Row]] = {}
+        # Client ID -> (reorder_lead_days, safety_stock_weeks) row, or None
+        self._client_config_cache: Dict[str, Optional[Row]] = {}
 
     async def calculate_monthly_usage(
         self,
         product_id: str,
-        client_id: str
+        client_id: str,
+        use_cache: bool = True
     ) -> UsageResult:
         """
         Main entry point - tries multiple methods and picks best result
 
+        Coroutine wrapper around calculate_monthly_usage_sync, which worker
+        threads call directly.
+        """
+        return self.calculate_monthly_usage_sync(product_id, client_id, use_cache)
+
+    def calculate_monthly_usage_sync(
+        self,
+        product_id: str,
+        client_id: str,
+        use_cache: bool = True
+    ) -> UsageResult:
+        """
+        Calculate one product's usage - tries multiple methods and picks best result
+
+        Blocks on the database, so async callers run it in a worker thread.
+        Product and client configuration lookups are cached on the calculator,
+        so reusing one calculator across products queries them once.
+
         Args:
             product_id: Product ID
             client_id: Client ID
+            use_cache: Return the cached result when the product's data is
+                unchanged since it was calculated, and cache this one; False
+                recalculates without reading the source fingerprint and evicts
+                the cached entry
 
         Returns:
             UsageResult with calculated metrics
         """
+        cache_key = (product_id, client_id)
+
+        if use_cache:
+            freshness = self._get_freshness_key(product_id)
+            with _result_cache_lock:
+                cached = _result_cache.get(cache_key)
+            if cached is not None and cached[0] == freshness:
+                return _copy_result(cached[1])
+
         # Attempt 1: Transaction/Order Fulfillment Method (most direct)
-        order_result = await self._calculate_from_orders(product_id)
+        order_result = self._calculate_from_orders(product_id)
 
         # Attempt 2: Snapshot Delta Method (most accurate for imports)
-        snapshot_result = await self._calculate_from_snapshots(product_id)
+        snapshot_result = self._calculate_from_snapshots(product_id)
 
-        # Attempt 3: Hybrid Method (combine both)
-        hybrid_result = await self._combine_results(order_result, snapshot_result)
+        # Attempt 4: Statistical Estimation (fallback), only when it could be picked
+        estimated_result = None
+        if self._needs_estimate(order_result, snapshot_result):
+            estimated_result = self._estimate_from_notification_point(
+                product_id, client_id
+            )
+
+        result = self._select_result(
+            product_id, order_result, snapshot_result, estimated_result
+        )
+
+        with _result_cache_lock:
+            if use_cache:
+                _result_cache[cache_key] = (freshness, _copy_result(result))
+            else:
+                # Forced recalculation: drop whatever an earlier calculation cached
+                _result_cache.pop(cache_key, None)
+
+        return result
+
+    async def calculate_monthly_usage_batch(
+        self,
+        product_ids: List[str],
+        client_id: str
+    ) -> Dict[str, Union[UsageResult, Exception]]:
+        """
+        Calculate usage for many products with one query per data source
+
+        Same methods and selection as calculate_monthly_usage, but the order
+        history, stock snapshots and product fields for the whole batch are
+        each loaded with a single grouped query and split per product.
+
+        Args:
+            product_ids: Product IDs
+            client_id: Client ID
+
+        Returns:
+            Dict of product ID -> UsageResult, or the exception raised while
+            calculating that product (query failures propagate)
+        """
+        monthly_orders = self._load_monthly_orders(product_ids)
+        snapshots = self._load_snapshots(product_ids)
+        self._preload_product_meta(product_ids)
+
+        # Run the methods for every product first, queueing the order and
+        # snapshot results so their confidence is scored in one vectorized call
+        results = {}
+        method_results = {}
+        pending_scores = []
+        for product_id in product_ids:
+            product = self._get_product_meta(product_id)
+            try:
+                method_results[product_id] = (
+                    self._order_result(product_id, monthly_orders.get(product_id), pending_scores),
+                    self._snapshot_result(product_id, snapshots.get(product_id), product, pending_scores)
+                )
+            except Exception as e:
+                results[product_id] = e
+
+        self._score_confidence_batch(pending_scores)
+
+        for product_id, (order_result, snapshot_result) in method_results.items():
+            try:
+                estimated_result = None
+                if self._needs_estimate(order_result, snapshot_result):
+                    estimated_result = self._estimate_from_notification_point(
+                        product_id, client_id
+                    )
+
+                results[product_id] = self._select_result(
+                    product_id, order_result, snapshot_result, estimated_result
+                )
+            except Exception as e:
+                results[product_id] = e
+
+        return {product_id: results[product_id] for product_id in product_ids}
+
+    def _needs_estimate(
+        self,
+        order_result: Optional[UsageResult],
+        snapshot_result: Optional[UsageResult]
+    ) -> bool:
+        """
+        Whether the notification-point estimate could be selected.
 
-        # Attempt 4: Statistical Estimation (fallback)
-        estimated_result = await self._estimate_from_notification_point(
-            product_id, client_id
+        It carries a fixed confidence and loses ties, so once a measured
+        result reaches that confidence the estimate can never be picked.
+        """
+        return all(
+            result is None or result.confidence_score < self.ESTIMATED_CONFIDENCE
+            for result in (order_result, snapshot_result)
         )
 
+    def _select_result(
+        self,
+        product_id: str,
+        order_result: Optional[UsageResult],
+        snapshot_result: Optional[UsageResult],
+        estimated_result: Optional[UsageResult]
+    ) -> UsageResult:
+        """Combine the method results, pick the most confident and enrich it."""
+        # Attempt 3: Hybrid Method (combine both)
+        hybrid_result = self._combine_results(order_result, snapshot_result)
+
         # Pick best result based on confidence scores
         results = [r for r in [hybrid_result, order_result, snapshot_result, estimated_result] if r is not None]
 
@@ -106,12 +262,186 @@ class UsageCalculator:
         results.sort(key=lambda r: r.confidence_score, reverse=True)
         final_result = results[0]
 
-        # Enrich with trend and seasonality analysis
-        final_result = await self._enrich_with_patterns(product_id, final_result)
+        # Enrich with trend and seasonality analysis, reusing the monthly order
+        # history already aggregated by the order fulfillment method
+        final_result = self._enrich_with_patterns(
+            final_result,
+            order_result.monthly_history if order_result else None
+        )
 
         return final_result
 
-    async def _calculate_from_orders(self, product_id: str) -> Optional[UsageResult]:
+    # Monthly completed-order totals over the 12 months before each product's
+    # latest completed order. ANY(:product_ids) binds the list as one array
+    # parameter, so the statement text is the same for every batch size.
+    MONTHLY_ORDERS_BATCH_QUERY = text("""
+        WITH max_date AS (
+            SELECT product_id, MAX(date_submitted) as ref_date
+            FROM transactions
+            WHERE product_id = ANY(:product_ids)
+              AND LOWER(order_status) = 'completed'
+            GROUP BY product_id
+        )
+        SELECT
+            t.product_id,
+            DATE_TRUNC('month', t.date_submitted) as month,
+            SUM(t.quantity_units) as total_units,
+            SUM(t.quantity_packs) as total_packs
+        FROM transactions t
+        JOIN max_date m ON m.product_id = t.product_id
+        WHERE t.date_submitted >= m.ref_date - INTERVAL '12 months'
+          AND LOWER(t.order_status) = 'completed'
+        GROUP BY t.product_id, DATE_TRUNC('month', t.date_submitted)
+        ORDER BY t.product_id, month ASC
+    """)
+
+    # Stock snapshots over the 12 months before each product's latest snapshot,
+    # with the unit change and whole days since the previous one (NULL on the first)
+    SNAPSHOTS_BATCH_QUERY = text("""
+        WITH max_date AS (
+            SELECT product_id, MAX(recorded_at) as ref_date
+            FROM stock_history
+            WHERE product_id = ANY(:product_ids)
+            GROUP BY product_id
+        )
+        SELECT
+            s.product_id,
+            s.recorded_at,
+            s.total_units - LAG(s.total_units) OVER w as delta_units,
+            FLOOR(EXTRACT(EPOCH FROM s.recorded_at - LAG(s.recorded_at) OVER w) / 86400)::int as days_between
+        FROM stock_history s
+        JOIN max_date m ON m.product_id = s.product_id
+        WHERE s.recorded_at >= m.ref_date - INTERVAL '12 months'
+        WINDOW w AS (PARTITION BY s.product_id ORDER BY s.recorded_at)
+        ORDER BY s.product_id, s.recorded_at ASC
+    """)
+
+    PRODUCT_META_QUERY = text("""
+        SELECT pack_size, notification_point
+        FROM products
+        WHERE id = :product_id
+    """)
+
+    PRODUCT_META_BATCH_QUERY = text("""
+        SELECT id, pack_size, notification_point
+        FROM products
+        WHERE id = ANY(:product_ids)
+    """)
+
+    def _load_monthly_orders(self, product_ids: List[str]) -> Dict[str, List[Row]]:
+        """Monthly order totals for a batch, as each product's rows in month order."""
+        rows = self.db.execute(
+            self.MONTHLY_ORDERS_BATCH_QUERY, {'product_ids': list(product_ids)}
+        ).fetchall()
+
+        monthly_orders = {}
+        for row in rows:
+            monthly_orders.setdefault(row.product_id, []).append(row)
+        return monthly_orders
+
+    def _load_snapshots(self, product_ids: List[str]) -> Dict[str, List[Row]]:
+        """Stock snapshot deltas for a batch, as each product's rows in time order."""
+        rows = self.db.execute(
+            self.SNAPSHOTS_BATCH_QUERY, {'product_ids': list(product_ids)}
+        ).fetchall()
+
+        snapshots = {}
+        for row in rows:
+            snapshots.setdefault(row.product_id, []).append(row)
+        return snapshots
+
+    # One row per product: the product fields the calculation reads plus a
+    # fingerprint of each source. Row counts catch inserts, deletes and orders
+    # changing status (back-dated ones included), the quantity sums catch edits
+    # and the epoch sums (plain and quantity-weighted) catch rows moving in time.
+    FRESHNESS_QUERY = text("""
+        SELECT
+            p.pack_size,
+            p.notification_point,
+            o.last_order_at,
+            o.order_count,
+            o.order_units,
+            o.order_packs,
+            o.order_epochs,
+            o.order_weighted_epochs,
+            s.last_snapshot_at,
+            s.snapshot_count,
+            s.snapshot_units,
+            s.snapshot_epochs,
+            s.snapshot_weighted_epochs
+        FROM products p
+        CROSS JOIN LATERAL (
+            SELECT
+                MAX(t.date_submitted) as last_order_at,
+                COUNT(*) as order_count,
+                SUM(t.quantity_units) as order_units,
+                SUM(t.quantity_packs) as order_packs,
+                SUM(EXTRACT(EPOCH FROM t.date_submitted)) as order_epochs,
+                SUM(EXTRACT(EPOCH FROM t.date_submitted) * t.quantity_units) as order_weighted_epochs
+            FROM transactions t
+            WHERE t.product_id = p.id
+              AND LOWER(t.order_status) = 'completed'
+        ) o
+        CROSS JOIN LATERAL (
+            SELECT
+                MAX(sh.recorded_at) as last_snapshot_at,
+                COUNT(*) as snapshot_count,
+                SUM(sh.total_units) as snapshot_units,
+                SUM(EXTRACT(EPOCH FROM sh.recorded_at)) as snapshot_epochs,
+                SUM(EXTRACT(EPOCH FROM sh.recorded_at) * sh.total_units) as snapshot_weighted_epochs
+            FROM stock_history sh
+            WHERE sh.product_id = p.id
+        ) s
+        WHERE p.id = :product_id
+    """)
+
+    def _get_freshness_key(self, product_id: str) -> Optional[tuple]:
+        """
+        Key that changes whenever a product's usage inputs change.
+
+        Also primes the product cache, so the calculation itself does not
+        look the product up again.
+        """
+        row = self.db.execute(self.FRESHNESS_QUERY, {'product_id': product_id}).first()
+        self._product_cache[product_id] = row
+        return tuple(row) if row is not None else None
+
+    def _get_product_meta(self, product_id: str) -> Optional[Row]:
+        """Pack size and notification point of a product, or None if it does not exist."""
+        if product_id not in self._product_cache:
+            self._product_cache[product_id] = self.db.execute(
+                self.PRODUCT_META_QUERY, {'product_id': product_id}
+            ).first()
+        return self._product_cache[product_id]
+
+    CLIENT_CONFIG_QUERY = text("""
+        SELECT reorder_lead_days, safety_stock_weeks
+        FROM client_configurations
+        WHERE client_id = :client_id
+    """)
+
+    def _get_client_config(self, client_id: str) -> Optional[Row]:
+        """Lead time settings of a client, or None if it has no configuration."""
+        if client_id not in self._client_config_cache:
+            self._client_config_cache[client_id] = self.db.execute(
+                self.CLIENT_CONFIG_QUERY, {'client_id': client_id}
+            ).first()
+        return self._client_config_cache[client_id]
+
+    def _preload_product_meta(self, product_ids: List[str]) -> None:
+        """Load the product fields for a batch into the cache with one query."""
+        missing = [product_id for product_id in product_ids if product_id not in self._product_cache]
+        if not missing:
+            return
+
+        rows = self.db.execute(
+            self.PRODUCT_META_BATCH_QUERY, {'product_ids': missing}
+        ).fetchall()
+
+        self._product_cache.update(dict.fromkeys(missing))
+        self._product_cache.update({row.id: row for row in rows})
+
+    def _calculate_from_orders(self, product_id: str) -> Optional[UsageResult]:
         """
         Calculate usage from transaction/order history
 
@@ -129,8 +459,7 @@ class UsageCalculator:
             SELECT
                 DATE_TRUNC('month', t.date_submitted) as month,
                 SUM(t.quantity_units) as total_units,
-                SUM(t.quantity_packs) as total_packs,
-                COUNT(*) as transaction_count
+                SUM(t.quantity_packs) as total_packs
             FROM transactions t, max_date m
             WHERE t.product_id = :product_id
               AND t.date_submitted >= m.ref_date - INTERVAL '12 months'
@@ -142,58 +471,59 @@ class UsageCalculator:
         result = self.db.execute(query, {'product_id': product_id})
         rows = result.fetchall()
 
+        return self._order_result(product_id, rows)
+
+    def _order_result(
+        self,
+        product_id: str,
+        rows: Optional[List[Row]],
+        pending_scores: Optional[list] = None
+    ) -> Optional[UsageResult]:
+        """Usage from monthly order total rows (month, total_units, total_packs), oldest first."""
         if not rows:
             return None
 
-        # Convert to DataFrame
-        df = pd.DataFrame(rows, columns=['month', 'total_units', 'total_packs', 'transaction_count'])
+        data_months = len(rows)
 
-        data_months = len(df)
-        if data_months == 0:
-            return None
+        # ~12 rows: plain arrays, no DataFrame (NULL sums become NaN as before)
+        units = np.array([row.total_units for row in rows], dtype=np.float64)
+        packs = np.array([row.total_packs for row in rows], dtype=np.float64)
 
         # Calculate weighted average (recent months weighted more)
-        weights = generate_time_weights(len(df))
-        weighted_avg_units = np.average(df['total_units'], weights=weights)
-        weighted_avg_packs = np.average(df['total_packs'], weights=weights)
+        weights = generate_time_weights(data_months)
+        weighted_avg_units = np.average(units, weights=weights)
+        weighted_avg_packs = np.average(packs, weights=weights)
 
-        # Calculate variance and CV
-        variance = df['total_units'].var()
-        cv = calculate_coefficient_of_variation(df['total_units'])
+        # Variance, CV and outliers
+        stats = dispersion_stats(units)
 
         # Days since last data
-        last_month = pd.to_datetime(df['month'].iloc[-1], utc=True)
-        days_since_last = (datetime.now(timezone.utc) - last_month.to_pydatetime()).days
+        days_since_last = (datetime.now(timezone.utc) - _as_utc(rows[-1].month)).days
 
-        # Detect outliers
-        outliers = detect_outliers_iqr(df['total_units'])
-
-        # Calculate confidence
-        confidence_score = self.confidence_calc.calculate_confidence(
-            data_points=data_months,
-            coefficient_of_variation=cv,
-            days_since_last_data=days_since_last,
-            calculation_method='order_fulfillment'
-        )
-
-        return UsageResult(
+        result = UsageResult(
             product_id=product_id,
             monthly_usage_units=float(weighted_avg_units),
             monthly_usage_packs=float(weighted_avg_packs),
             calculation_method='order_fulfillment',
-            confidence_score=confidence_score,
-            confidence_level=self.confidence_calc.classify_confidence_level(confidence_score),
+            confidence_score=0.0,       # Set by _score_confidence
+            confidence_level='low',
             data_months=data_months,
             calculation_tier=self.confidence_calc.determine_calculation_tier(data_months),
             seasonality_detected=False,  # Will be enriched later
             trend_direction='unknown',     # Will be enriched later
-            outliers_detected=outliers['outlier_count'],
-            variance=float(variance),
-            cv=float(cv),
-            days_since_last_data=days_since_last
+            outliers_detected=stats['outlier_count'],
+            variance=stats['variance'],
+            cv=stats['cv'],
+            days_since_last_data=days_since_last,
+            monthly_history=units
         )
 
-    async def _calculate_from_snapshots(self, product_id: str) -> Optional[UsageResult]:
+        # Calculate confidence
+        self._score_confidence(result, data_months, pending_scores)
+
+        return result
+
+    def _calculate_from_snapshots(self, product_id: str) -> Optional[UsageResult]:
         """
         Calculate usage from stock history snapshots
 
@@ -209,12 +539,12 @@ class UsageCalculator:
             )
             SELECT
                 s.recorded_at,
-                s.packs_available,
-                s.total_units,
-                s.source
+                s.total_units - LAG(s.total_units) OVER w as delta_units,
+                FLOOR(EXTRACT(EPOCH FROM s.recorded_at - LAG(s.recorded_at) OVER w) / 86400)::int as days_between
             FROM stock_history s, max_date m
             WHERE s.product_id = :product_id
               AND s.recorded_at >= m.ref_date - INTERVAL '12 months'
+            WINDOW w AS (ORDER BY s.recorded_at)
             ORDER BY s.recorded_at ASC
         """)
 
@@ -224,81 +554,125 @@ class UsageCalculator:
         if len(rows) < 2:
             return None
 
-        # Convert to DataFrame
-        df = pd.DataFrame(rows, columns=['recorded_at', 'packs_available', 'total_units', 'source'])
-        df['recorded_at'] = pd.to_datetime(df['recorded_at'], utc=True)
+        return self._snapshot_result(product_id, rows, self._get_product_meta(product_id))
 
-        # Calculate deltas between consecutive snapshots
-        df['delta_units'] = df['total_units'].diff()
-        df['days_between'] = df['recorded_at'].diff().dt.days
+    def _snapshot_result(
+        self,
+        product_id: str,
+        rows: Optional[List[Row]],
+        product: Optional[Row],
+        pending_scores: Optional[list] = None
+    ) -> Optional[UsageResult]:
+        """
+        Usage from stock snapshot rows (recorded_at, delta_units, days_between),
+        oldest first, with the deltas to the previous snapshot computed in SQL.
+        """
+        if not rows or len(rows) < 2:
+            return None
 
-        # Filter for consumption events (negative deltas)
-        consumption_df = df[df['delta_units'] < 0].copy()
-        consumption_df['consumption'] = consumption_df['delta_units'].abs()
+        # Unit deltas between consecutive snapshots, in whole days between
+        # them; the first row has no predecessor (NULLs become NaN)
+        delta_units = np.array([row.delta_units for row in rows[1:]], dtype=np.float64)
+        days_between = np.array([row.days_between for row in rows[1:]], dtype=np.float64)
 
-        if len(consumption_df) == 0:
+        # Consumption events (negative deltas) with at least a day between
+        # snapshots; same-day snapshots have no daily rate
+        consumed = (delta_units < 0) & (days_between > 0)
+        if not consumed.any():
             return None
 
-        # Calculate daily usage rate per event
-        consumption_df['daily_usage'] = consumption_df['consumption'] / consumption_df['days_between']
+        # Daily usage rate per event
+        daily_usage = -delta_units[consumed] / days_between[consumed]
 
         # Remove outliers (unrealistic daily rates)
-        consumption_df = consumption_df[consumption_df['daily_usage'] > 0]
-        consumption_df = consumption_df[consumption_df['daily_usage'] < consumption_df['daily_usage'].quantile(0.95)]
+        daily_usage = daily_usage[daily_usage < np.quantile(daily_usage, 0.95)]
 
-        if len(consumption_df) == 0:
+        if daily_usage.size == 0:
             return None
 
         # Calculate monthly usage (daily * 30.44)
-        avg_daily_usage = consumption_df['daily_usage'].mean()
+        avg_daily_usage = daily_usage.mean()
         monthly_usage_units = avg_daily_usage * 30.44
 
-        # Get pack size
-        product = self.db.query(Product).filter(Product.id == product_id).first()
         pack_size = product.pack_size if product else 1
         monthly_usage_packs = monthly_usage_units / pack_size
 
-        # Calculate variance and CV
-        consumption_df['monthly_equiv'] = consumption_df['daily_usage'] * 30.44
-        variance = consumption_df['monthly_equiv'].var()
-        cv = calculate_coefficient_of_variation(consumption_df['monthly_equiv'])
+        # Variance, CV and outliers of the monthly-equivalent rates
+        stats = dispersion_stats(daily_usage * 30.44)
 
         # Days since last data
-        days_since_last = (datetime.now(timezone.utc) - df['recorded_at'].iloc[-1].to_pydatetime()).days
-
-        # Outliers
-        outliers = detect_outliers_iqr(consumption_df['monthly_equiv'])
+        first_recorded_at = _as_utc(rows[0].recorded_at)
+        last_recorded_at = _as_utc(rows[-1].recorded_at)
+        days_since_last = (datetime.now(timezone.utc) - last_recorded_at).days
 
         # Estimate data months (approximate based on date range)
-        date_range = (df['recorded_at'].iloc[-1] - df['recorded_at'].iloc[0]).days
+        date_range = (last_recorded_at - first_recorded_at).days
         data_months = int(date_range / 30.44)
 
-        # Confidence
-        confidence_score = self.confidence_calc.calculate_confidence(
-            data_points=len(consumption_df),
-            coefficient_of_variation=cv,
-            days_since_last_data=days_since_last,
-            calculation_method='snapshot_delta'
-        )
-
-        return UsageResult(
+        result = UsageResult(
             product_id=product_id,
             monthly_usage_units=float(monthly_usage_units),
             monthly_usage_packs=float(monthly_usage_packs),
             calculation_method='snapshot_delta',
-            confidence_score=confidence_score,
-            confidence_level=self.confidence_calc.classify_confidence_level(confidence_score),
+            confidence_score=0.0,       # Set by _score_confidence
+            confidence_level='low',
             data_months=data_months,
             calculation_tier=self.confidence_calc.determine_calculation_tier(data_months),
             seasonality_detected=False,
             trend_direction='unknown',
-            outliers_detected=outliers['outlier_count'],
-            variance=float(variance),
-            cv=float(cv),
+            outliers_detected=stats['outlier_count'],
+            variance=stats['variance'],
+            cv=stats['cv'],
             days_since_last_data=days_since_last
         )
 
-    async def _combine_results(
+        # Confidence
+        self._score_confidence(result, daily_usage.size, pending_scores)
+
+        return result
+
+    def _score_confidence(
+        self,
+        result: UsageResult,
+        data_points: int,
+        pending_scores: Optional[list]
+    ) -> None:
+        """
+        Set a method result's confidence score and level from its data points,
+        CV, recency and method, or queue it on pending_scores for
+        _score_confidence_batch.
+        """
+        if pending_scores is not None:
+            pending_scores.append((result, data_points))
+            return
+
+        result.confidence_score = self.confidence_calc.calculate_confidence(
+            data_points=data_points,
+            coefficient_of_variation=result.cv,
+            days_since_last_data=result.days_since_last_data,
+            calculation_method=result.calculation_method
+        )
+        result.confidence_level = self.confidence_calc.classify_confidence_level(result.confidence_score)
+
+    def _score_confidence_batch(self, pending_scores: list) -> None:
+        """Score every queued (result, data_points) pair with one vectorized call."""
+        if not pending_scores:
+            return
+
+        results, data_points = zip(*pending_scores)
+        scores = self.confidence_calc.calculate_confidence_batch(
+            data_points,
+            [result.cv for result in results],
+            [result.days_since_last_data for result in results],
+            [result.calculation_method for result in results]
+        )
+        levels = self.confidence_calc.classify_confidence_level_batch(scores)
+
+        for result, score, level in zip(results, scores, levels):
+            result.confidence_score = score
+            result.confidence_level = level
+
+    def _combine_results(
         self,
         order_result: Optional[UsageResult],
         snapshot_result: Optional[UsageResult]
@@ -337,10 +711,8 @@ class UsageCalculator:
         )
 
         # Combined confidence is higher than individual
-        combined_confidence = min(
-            (order_result.confidence_score + snapshot_result.confidence_score) / 1.5,
-            1.0
-        )
+        combined_confidence = min(total_confidence / 1.5, 1.0)
+        data_months = max(order_result.data_months, snapshot_result.data_months)
 
         return UsageResult(
             product_id=order_result.product_id,
@@ -349,10 +721,8 @@ class UsageCalculator:
             calculation_method='hybrid',
             confidence_score=combined_confidence,
             confidence_level=self.confidence_calc.classify_confidence_level(combined_confidence),
-            data_months=max(order_result.data_months, snapshot_result.data_months),
-            calculation_tier=self.confidence_calc.determine_calculation_tier(
-                max(order_result.data_months, snapshot_result.data_months)
-            ),
+            data_months=data_months,
+            calculation_tier=self.confidence_calc.determine_calculation_tier(data_months),
             seasonality_detected=False,
             trend_direction='unknown',
             outliers_detected=order_result.outliers_detected + snapshot_result.outliers_detected,
@@ -361,10 +731,11 @@ class UsageCalculator:
             days_since_last_data=min(
                 order_result.days_since_last_data,
                 snapshot_result.days_since_last_data
-            )
+            ),
+            monthly_history=order_result.monthly_history
         )
 
-    async def _estimate_from_notification_point(
+    def _estimate_from_notification_point(
         self,
         product_id: str,
         client_id: str
@@ -374,15 +745,22 @@ class UsageCalculator:
 
         Assumes notification point = 2-4 weeks of usage
         """
-        product = self.db.query(Product).filter(Product.id == product_id).first()
+        product = self._get_product_meta(product_id)
 
         if not product or not product.notification_point:
             return None
 
-        # Get client configuration
-        config = self.db.query(ClientConfiguration).filter(
-            ClientConfiguration.client_id == client_id
-        ).first()
+        return self._notification_estimate(product_id, product, self._get_client_config(client_id))
+
+    def _notification_estimate(
+        self,
+        product_id: str,
+        product: Optional[Row],
+        config: Optional[Row]
+    ) -> Optional[UsageResult]:
+        """Estimate from a product's notification point and the client's lead time settings."""
+        if not product or not product.notification_point:
+            return None
 
         lead_time_weeks = (config.reorder_lead_days if config else 14) / 7
         safety_weeks = config.safety_stock_weeks if config else 2
@@ -400,7 +778,7 @@ class UsageCalculator:
             monthly_usage_units=float(monthly_usage_units),
             monthly_usage_packs=float(monthly_usage_packs),
             calculation_method='estimated',
-            confidence_score=0.3,  # Low confidence
+            confidence_score=self.ESTIMATED_CONFIDENCE,  # Low confidence
             confidence_level='low',
             data_months=0,
             calculation_tier='estimated',
@@ -409,50 +787,29 @@ class UsageCalculator:
             outliers_detected=0
         )
 
-    async def _enrich_with_patterns(
+    def _enrich_with_patterns(
         self,
-        product_id: str,
-        result: UsageResult
+        result: UsageResult,
+        monthly_history: Optional[np.ndarray]
     ) -> UsageResult:
         """
         Add trend and seasonality analysis to usage result.
-        Uses the most recent transaction date as reference point (not NOW())
-        to support historical data imports.
-        """
-        # Get monthly history for pattern detection
-        query = text("""
-            WITH max_date AS (
-                SELECT MAX(date_submitted) as ref_date
-                FROM transactions
-                WHERE product_id = :product_id
-                  AND LOWER(order_status) = 'completed'
-            )
-            SELECT
-                DATE_TRUNC('month', t.date_submitted) as month,
-                SUM(t.quantity_units) as total_units
-            FROM transactions t, max_date m
-            WHERE t.product_id = :product_id
-              AND t.date_submitted >= m.ref_date - INTERVAL '12 months'
-              AND LOWER(t.order_status) = 'completed'
-            GROUP BY DATE_TRUNC('month', t.date_submitted)
-            ORDER BY month ASC
-        """)
-
-        db_result = self.db.execute(query, {'product_id': product_id})
-        rows = db_result.fetchall()
 
-        if not rows or len(rows) < 3:
+        Works from the monthly completed-order totals aggregated by
+        _calculate_from_orders (anchored on the most recent transaction date),
+        so no second query is issued. No order history means no patterns.
+        """
+        if monthly_history is None or len(monthly_history) < 3:
             return result
 
-        df = pd.DataFrame(rows, columns=['month', 'total_units'])
-        monthly_usage = df['total_units'].tolist()
+        monthly_usage = monthly_history.tolist()
 
         # Trend analysis
         trend_info = calculate_usage_velocity_trend(monthly_usage)
         result.trend_direction = trend_info['trend']
 
         # Seasonality detection
-        seasonality_info = detect_seasonality(df.set_index('month')['total_units'])
+        seasonality_info = detect_seasonality(monthly_history)
         result.seasonality_detected = seasonality_info['seasonal']
 
         return result
@@ -1,7 +1,9 @@
 """
 Confidence scoring system for usage calculations
 """
-from typing import Optional
+from bisect import bisect_left, bisect_right
+from typing import Optional, List, Sequence
+import numpy as np
 
 class ConfidenceCalculator:
     """
@@ -26,6 +28,14 @@ class ConfidenceCalculator:
         'estimated': 0.3
     }
 
+    # Factor score lookup tables: score[i] applies between threshold[i-1] and threshold[i]
+    DATA_POINT_THRESHOLDS = (3, 6, 12)         # at least (bisect_right)
+    DATA_POINT_SCORES = (0.25, 0.5, 0.75, 1.0)
+    CONSISTENCY_THRESHOLDS = (0.2, 0.5, 1.0)   # below (bisect_right)
+    CONSISTENCY_SCORES = (1.0, 0.7, 0.4, 0.2)
+    RECENCY_THRESHOLDS = (30, 60, 90)          # at most (bisect_left)
+    RECENCY_SCORES = (1.0, 0.8, 0.6, 0.4)
+
     def calculate_confidence(
         self,
         data_points: int,
@@ -73,38 +83,59 @@ class ConfidenceCalculator:
 
         return round(confidence, 2)
 
+    def calculate_confidence_batch(
+        self,
+        data_points: Sequence[int],
+        coefficient_of_variation: Sequence[float],
+        days_since_last_data: Sequence[int],
+        calculation_methods: Sequence[str],
+        cross_validation_scores: Optional[Sequence[float]] = None
+    ) -> List[float]:
+        """
+        Vectorized calculate_confidence over parallel sequences (one entry per result)
+
+        Returns:
+            Confidence scores, identical to calling calculate_confidence per entry
+        """
+        data_scores = np.take(self.DATA_POINT_SCORES, np.searchsorted(
+            self.DATA_POINT_THRESHOLDS, np.asarray(data_points, dtype=np.float64), side='right'
+        ))
+        consistency_scores = np.take(self.CONSISTENCY_SCORES, np.searchsorted(
+            self.CONSISTENCY_THRESHOLDS, np.asarray(coefficient_of_variation, dtype=np.float64), side='right'
+        ))
+        recency_scores = np.take(self.RECENCY_SCORES, np.searchsorted(
+            self.RECENCY_THRESHOLDS, np.asarray(days_since_last_data, dtype=np.float64), side='left'
+        ))
+        method_scores = np.array(
+            [self.METHOD_SCORES.get(method, 0.5) for method in calculation_methods], dtype=np.float64
+        )
+        cv_scores = (
+            np.array([0.5 if score is None else score for score in cross_validation_scores], dtype=np.float64)
+            if cross_validation_scores is not None else 0.5
+        )
+
+        # Same summation order as calculate_confidence, rounded on Python floats
+        confidence = (
+            self.WEIGHTS['data_points'] * data_scores +
+            self.WEIGHTS['consistency'] * consistency_scores +
+            self.WEIGHTS['recency'] * recency_scores +
+            self.WEIGHTS['method_reliability'] * method_scores +
+            self.WEIGHTS['cross_validation'] * cv_scores
+        )
+
+        return [round(value, 2) for value in confidence.tolist()]
+
     def _score_data_points(self, data_points: int) -> float:
         """Score based on number of data points"""
-        if data_points >= 12:
-            return 1.0
-        elif data_points >= 6:
-            return 0.75
-        elif data_points >= 3:
-            return 0.5
-        else:
-            return 0.25
+        return self.DATA_POINT_SCORES[bisect_right(self.DATA_POINT_THRESHOLDS, data_points)]
 
     def _score_consistency(self, coefficient_of_variation: float) -> float:
         """Score based on consistency (lower CV = higher score)"""
-        if coefficient_of_variation < 0.2:
-            return 1.0
-        elif coefficient_of_variation < 0.5:
-            return 0.7
-        elif coefficient_of_variation < 1.0:
-            return 0.4
-        else:
-            return 0.2
+        return self.CONSISTENCY_SCORES[bisect_right(self.CONSISTENCY_THRESHOLDS, coefficient_of_variation)]
 
     def _score_recency(self, days_since_last_data: int) -> float:
         """Score based on data recency"""
-        if days_since_last_data <= 30:
-            return 1.0
-        elif days_since_last_data <= 60:
-            return 0.8
-        elif days_since_last_data <= 90:
-            return 0.6
-        else:
-            return 0.4
+        return self.RECENCY_SCORES[bisect_left(self.RECENCY_THRESHOLDS, days_since_last_data)]
 
     def classify_confidence_level(self, score: float) -> str:
         """
@@ -119,6 +150,13 @@ class ConfidenceCalculator:
         else:
             return 'low'
 
+    def classify_confidence_level_batch(self, scores: Sequence[float]) -> List[str]:
+        """Vectorized classify_confidence_level"""
+        scores = np.asarray(scores, dtype=np.float64)
+        return np.select(
+            [scores >= 0.75, scores >= 0.50], ['high', 'medium'], default='low'
+        ).tolist()
+
     def determine_calculation_tier(self, data_months: int) -> str:
         """
         Determine calculation tier based on data availability
@@ -1,12 +1,15 @@
 """
 Statistical utility functions for data analysis
 """
+import math
+from functools import lru_cache
 import numpy as np
-from scipy import stats
-from scipy.fft import fft, fftfreq
+from scipy.fft import rfft, rfftfreq
 from scipy.signal import detrend
+from scipy.special import stdtr
 import pandas as pd
-from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple, Union
 
 def calculate_weeks_remaining(
     available_quantity: float,
@@ -38,6 +41,31 @@ def calculate_weeks_remaining(
 
     return round(weeks_remaining, 2)
 
+def calculate_weeks_remaining_batch(available_quantities, monthly_usages) -> List[Optional[float]]:
+    """
+    Vectorized calculate_weeks_remaining over a batch of products
+
+    Args:
+        available_quantities: Array-like of current stock, one entry per product
+        monthly_usages: Array-like of monthly consumption, same unit and order
+
+    Returns:
+        Weeks remaining (None where usage is not positive), identical to
+        calling calculate_weeks_remaining per product
+    """
+    available = np.asarray(available_quantities, dtype=np.float64)
+    monthly = np.asarray(monthly_usages, dtype=np.float64)
+    usable = ~(monthly <= 0)
+
+    # Same operation order as the scalar version, rounded on Python floats
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weeks = available / (monthly / 4.33)
+
+    return [
+        round(value, 2) if ok else None
+        for value, ok in zip(weeks.tolist(), usable.tolist())
+    ]
+
 def classify_stock_status(weeks_remaining: Optional[float]) -> str:
     """
     Classify stock health based on weeks remaining
@@ -56,6 +84,28 @@ def classify_stock_status(weeks_remaining: Optional[float]) -> str:
     else:
         return 'healthy'
 
+# Upper bounds (inclusive) of the critical / low / watch bands used by classify_stock_status
+STOCK_STATUS_THRESHOLDS = np.array([2.0, 4.0, 8.0])
+STOCK_STATUS_LABELS = np.array(['critical', 'low', 'watch', 'healthy', 'unknown'], dtype=object)
+
+def classify_stock_status_batch(weeks_remaining) -> np.ndarray:
+    """
+    Vectorized classify_stock_status over a batch of products
+
+    Args:
+        weeks_remaining: Array-like of weeks remaining (None/NaN = unknown)
+
+    Returns:
+        Array of status strings, same order as the input
+    """
+    weeks = np.asarray(weeks_remaining, dtype=np.float64)
+
+    # side='left' keeps the bands inclusive at their upper bound (2 -> critical)
+    codes = np.searchsorted(STOCK_STATUS_THRESHOLDS, weeks, side='left')
+    codes[np.isnan(weeks)] = len(STOCK_STATUS_LABELS) - 1
+
+    return STOCK_STATUS_LABELS[codes]
+
 def calculate_usage_velocity_trend(monthly_usage_history: List[float]) -> Dict:
     """
     Analyze if usage is increasing, stable, or decreasing using linear regression
@@ -75,13 +125,27 @@ def calculate_usage_velocity_trend(monthly_usage_history: List[float]) -> Dict:
             'monthly_change_rate': 0.0
         }
 
-    x = np.arange(len(monthly_usage_history))
-    y = np.array(monthly_usage_history)
+    y = np.asarray(monthly_usage_history, dtype=np.float64)
+    n = len(y)
+    mean_usage = y.mean()
 
-    # Linear regression
-    slope, intercept, r_value, p_value, std_err = stats.linregress(x, y)
+    # Least-squares fit against x = 0..n-1 in closed form (as stats.linregress);
+    # x has mean (n - 1) / 2 and sum of squared deviations n(n^2 - 1) / 12
+    dy = y - mean_usage
+    sxx = n * (n * n - 1) / 12.0
+    sxy = float((np.arange(n) - (n - 1) / 2.0) @ dy)
+    syy = float(dy @ dy)
 
-    mean_usage = np.mean(y)
+    slope = sxy / sxx
+    if syy == 0.0:
+        r_value = np.nan if sxy == 0.0 else 0.0
+    else:
+        r_value = min(max(sxy / math.sqrt(sxx * syy), -1.0), 1.0)
+
+    # Two-sided p-value of the slope from the t statistic with n - 2 degrees of freedom
+    df = n - 2
+    t_stat = r_value * math.sqrt(df / ((1.0 - r_value + 1e-20) * (1.0 + r_value + 1e-20)))
+    p_value = 2.0 * stdtr(df, -abs(t_stat))
 
     # Determine trend direction (consider trend significant if slope > 5% of mean)
     if abs(slope) < 0.05 * mean_usage:
@@ -109,19 +173,24 @@ def detect_outliers_iqr(values: pd.Series) -> Dict:
     Returns:
         Dictionary with outlier information
     """
-    Q1 = values.quantile(0.25)
-    Q3 = values.quantile(0.75)
+    array = values.to_numpy(dtype=np.float64)
+
+    # Both quartiles from one selection on the raw array (NaNs skipped, as Series.quantile)
+    if array.size and not np.isnan(array).all():
+        Q1, Q3 = np.nanquantile(array, (0.25, 0.75))
+    else:
+        Q1 = Q3 = np.nan
     IQR = Q3 - Q1
 
     lower_bound = Q1 - 1.5 * IQR
     upper_bound = Q3 + 1.5 * IQR
 
-    outliers = values[(values < lower_bound) | (values > upper_bound)]
+    outlier_mask = (array < lower_bound) | (array > upper_bound)
 
     return {
-        'outlier_count': len(outliers),
-        'outlier_indices': outliers.index.tolist() if hasattr(outliers.index, 'tolist') else [],
-        'outlier_values': outliers.tolist(),
+        'outlier_count': int(np.count_nonzero(outlier_mask)),
+        'outlier_indices': values.index[outlier_mask].tolist(),
+        'outlier_values': values.to_numpy()[outlier_mask].tolist(),
         'lower_bound': float(lower_bound),
         'upper_bound': float(upper_bound)
     }
@@ -137,32 +206,44 @@ def detect_outliers_zscore(values: pd.Series, threshold: float = 3.0) -> Dict:
     Returns:
         Dictionary with outlier information
     """
-    z_scores = np.abs(stats.zscore(values.dropna()))
-    outlier_mask = z_scores > threshold
-    outliers = values[outlier_mask]
+    array = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    present = np.flatnonzero(~np.isnan(array))
+    if not present.size:
+        return {'outlier_count': 0, 'outlier_indices': [], 'outlier_values': [], 'z_scores': []}
+    scored = array[present]
+
+    # Population z-scores (ddof=0) of the non-missing values, as scipy.stats.zscore
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z_scores = np.abs((scored - scored.mean()) / scored.std())
+
+    # Positions of the outliers in the original series (missing values are skipped)
+    outlier_positions = present[z_scores > threshold]
 
     return {
-        'outlier_count': len(outliers),
-        'outlier_indices': outliers.index.tolist() if hasattr(outliers.index, 'tolist') else [],
-        'outlier_values': outliers.tolist(),
+        'outlier_count': len(outlier_positions),
+        'outlier_indices': values.index[outlier_positions].tolist(),
+        'outlier_values': values.to_numpy()[outlier_positions].tolist(),
         'z_scores': z_scores.tolist()
     }
 
 def detect_seasonality(
-    monthly_series: pd.Series,
+    monthly_series: Union[pd.Series, np.ndarray],
     significance_level: float = 0.05
 ) -> Dict:
     """
     Detect seasonal patterns using Fourier Transform
 
     Args:
-        monthly_series: Time series data (monthly frequency)
+        monthly_series: Time series data (monthly frequency), Series or array
         significance_level: Statistical significance threshold
 
     Returns:
         Dictionary with seasonality information
     """
-    if len(monthly_series) < 12:
+    values = np.asarray(monthly_series, dtype=np.float64)
+
+    # Too short, or flat (the spectrum of a constant series is rounding noise)
+    if len(values) < 12 or np.ptp(values) <= 1e-12 * abs(values.mean()):
         return {
             'seasonal': False,
             'patterns': [],
@@ -170,23 +251,26 @@ def detect_seasonality(
         }
 
     # Detrend the series
-    detrended = detrend(monthly_series.values)
+    detrended = detrend(values)
 
-    # FFT analysis
-    fft_values = fft(detrended)
-    frequencies = fftfreq(len(detrended), d=1)  # d=1 for monthly data
+    # FFT analysis; the input is real, so only the non-negative half is computed
+    n = len(detrended)
+    fft_values = rfft(detrended)
+    frequencies = rfftfreq(n, d=1)  # d=1 for monthly data
 
     # Calculate power spectrum
-    power = np.abs(fft_values) ** 2
+    power = fft_values.real ** 2 + fft_values.imag ** 2
 
-    # Find dominant frequencies (positive only)
-    positive_freq_idx = frequencies > 0
+    # Find dominant frequencies (positive only: skip DC, and the Nyquist bin
+    # of an even length, which the two-sided spectrum counts as negative)
+    positive_freq_idx = slice(1, (n + 1) // 2)
     positive_freqs = frequencies[positive_freq_idx]
     positive_power = power[positive_freq_idx]
 
-    # Get top 5 frequencies
+    # Get top 5 frequencies (ascending power, so the last one is the peak);
+    # classified below as Python floats rather than NumPy scalars
     top_indices = np.argsort(positive_power)[-5:]
-    dominant_frequencies = positive_freqs[top_indices]
+    dominant_frequencies = positive_freqs[top_indices].tolist()
 
     patterns = []
     for freq in dominant_frequencies:
@@ -202,8 +286,8 @@ def detect_seasonality(
                 patterns.append({'type': 'biannual', 'period_months': 6})
 
     # Calculate overall seasonality strength
-    total_power = np.sum(positive_power)
-    seasonality_strength = float(np.max(positive_power) / total_power) if total_power > 0 else 0.0
+    total_power = positive_power.sum()
+    seasonality_strength = float(positive_power[top_indices[-1]] / total_power) if total_power > 0 else 0.0
 
     return {
         'seasonal': len(patterns) > 0,
@@ -225,16 +309,50 @@ def calculate_coefficient_of_variation(values: pd.Series) -> float:
     std_val = values.std()
     return float(std_val / mean_val)
 
+def dispersion_stats(values: np.ndarray) -> Dict:
+    """
+    Mean, sample variance, coefficient of variation and IQR outlier count of
+    a non-empty array in one call
+
+    Matches Series.var(), calculate_coefficient_of_variation and
+    detect_outliers_iqr, sharing the mean and taking both quartiles from a
+    single selection instead of three passes over a Series.
+
+    Args:
+        values: Array of values (no NaNs)
+
+    Returns:
+        Dictionary with mean, variance, cv and outlier_count
+    """
+    mean = values.mean()
+    variance = values.var(ddof=1) if values.size > 1 else np.nan
+    cv = np.sqrt(variance) / mean if mean != 0 else np.inf
+
+    q1, q3 = np.quantile(values, (0.25, 0.75))
+    iqr = q3 - q1
+    outlier_count = np.count_nonzero((values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr))
+
+    return {
+        'mean': float(mean),
+        'variance': float(variance),
+        'cv': float(cv),
+        'outlier_count': int(outlier_count)
+    }
+
+@lru_cache(maxsize=32)
 def generate_time_weights(n_periods: int, recent_weight: float = 1.5) -> np.ndarray:
     """
     Generate time-based weights for weighted average (recent data weighted more)
 
+    Memoized: n_periods is a month count (almost always 1-13), so the same
+    few arrays are shared by every caller and returned read-only.
+
     Args:
         n_periods: Number of time periods
         recent_weight: Multiplier for most recent 3 months
 
     Returns:
-        Array of weights
+        Array of weights (read-only)
     """
     weights = np.ones(n_periods)
 
@@ -243,12 +361,15 @@ def generate_time_weights(n_periods: int, recent_weight: float = 1.5) -> np.ndar
         weights[-3:] = recent_weight
 
     # Normalize weights to sum to 1
-    return weights / weights.sum()
+    weights = weights / weights.sum()
+    weights.flags.writeable = False
+    return weights
 
 def predict_stockout_date(
     current_stock: float,
     daily_usage_rate: float,
-    usage_variance: float = 0.0
+    usage_variance: float = 0.0,
+    now: Optional[datetime] = None
 ) -> Dict:
     """
     Predict when product will stockout based on current consumption rate
@@ -257,42 +378,107 @@ def predict_stockout_date(
         current_stock: Current available quantity
         daily_usage_rate: Average daily consumption
         usage_variance: Variance in daily usage
+        now: Reference time for the prediction (defaults to datetime.now())
 
     Returns:
-        Dictionary with prediction and confidence interval
+        Dictionary with prediction and confidence interval. 'predicted_date' is
+        ISO formatted; 'predicted_date_dt' carries the same value as a datetime.
     """
-    from datetime import datetime, timedelta
-
     if daily_usage_rate <= 0 or current_stock <= 0:
-        return {
-            'predicted_date': None,
-            'days_until_stockout': None,
-            'confidence_score': 0.0,
-            'confidence_interval': None
-        }
+        return _no_stockout_prediction()
 
     # Base prediction
     days_until_stockout = current_stock / daily_usage_rate
-    predicted_date = datetime.now() + timedelta(days=days_until_stockout)
 
     # Calculate confidence interval using variance
     if usage_variance > 0:
-        std_dev = np.sqrt(usage_variance)
+        std_dev = math.sqrt(usage_variance)
         # 95% confidence interval (±1.96 std deviations)
-        margin_days = 1.96 * (std_dev / daily_usage_rate) * np.sqrt(days_until_stockout)
-
-        earliest_date = predicted_date - timedelta(days=margin_days)
-        latest_date = predicted_date + timedelta(days=margin_days)
+        margin_days = 1.96 * (std_dev / daily_usage_rate) * math.sqrt(days_until_stockout)
 
         # Confidence decreases with wider intervals
         confidence = 1.0 / (1.0 + (margin_days / days_until_stockout))
+    else:
+        margin_days = None
+        confidence = 0.5  # Medium confidence without variance data
+
+    return _stockout_prediction(now or datetime.now(), days_until_stockout, margin_days, confidence)
+
+def predict_stockout_date_batch(
+    current_stock,
+    daily_usage_rate,
+    usage_variance,
+    now: Optional[datetime] = None
+) -> List[Dict]:
+    """
+    Vectorized predict_stockout_date over a batch of products
+
+    Args:
+        current_stock: Array-like of current available quantity, one entry per product
+        daily_usage_rate: Array-like of average daily consumption
+        usage_variance: Array-like of variance in daily usage
+        now: Reference time for every prediction (defaults to datetime.now())
+
+    Returns:
+        Predictions per product, identical to calling predict_stockout_date
+        per product with the same reference time
+    """
+    stock = np.asarray(current_stock, dtype=np.float64)
+    daily = np.asarray(daily_usage_rate, dtype=np.float64)
+    variance = np.asarray(usage_variance, dtype=np.float64)
+    now = now or datetime.now()
+
+    predictable = ~((daily <= 0) | (stock <= 0))
+    has_variance = variance > 0
+
+    # Same operation order as the scalar version
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days_until_stockout = stock / daily
+        margin_days = 1.96 * (np.sqrt(variance) / daily) * np.sqrt(days_until_stockout)
+        confidence = 1.0 / (1.0 + (margin_days / days_until_stockout))
+
+    return [
+        _stockout_prediction(now, days, margin if spread else None, score if spread else 0.5)
+        if ok else _no_stockout_prediction()
+        for ok, spread, days, margin, score in zip(
+            predictable.tolist(),
+            has_variance.tolist(),
+            days_until_stockout.tolist(),
+            margin_days.tolist(),
+            confidence.tolist()
+        )
+    ]
+
+def _no_stockout_prediction() -> Dict:
+    """Prediction for a product that is out of stock or not being used."""
+    return {
+        'predicted_date': None,
+        'predicted_date_dt': None,
+        'days_until_stockout': None,
+        'confidence_score': 0.0,
+        'confidence_interval': None
+    }
+
+def _stockout_prediction(
+    now: datetime,
+    days_until_stockout: float,
+    margin_days: Optional[float],
+    confidence: float
+) -> Dict:
+    """Dates and result dictionary of a stockout prediction (no margin = point interval)."""
+    predicted_date = now + timedelta(days=days_until_stockout)
+
+    if margin_days is not None:
+        margin = timedelta(days=margin_days)
+        earliest_date = predicted_date - margin
+        latest_date = predicted_date + margin
     else:
         earliest_date = predicted_date
         latest_date = predicted_date
-        confidence = 0.5  # Medium confidence without variance data
 
     return {
         'predicted_date': predicted_date.isoformat(),
+        'predicted_date_dt': predicted_date,
         'days_until_stockout': int(days_until_stockout),
         'confidence_score': round(confidence, 2),
         'confidence_interval': {
@@ -341,21 +527,81 @@ def calculate_reorder_quantity(
     # Suggested order quantity
     suggested_qty = max(0, reorder_point - current_stock)
 
-    # Round to pack size
-    suggested_packs = np.ceil(suggested_qty / pack_size) if pack_size > 0 else suggested_qty
+    # Round to pack size (scalar math; NumPy ufuncs on Python floats cost more than the arithmetic)
+    suggested_packs = math.ceil(suggested_qty / pack_size) if pack_size > 0 else suggested_qty
 
     # Apply order multiple if specified
     if order_multiple and order_multiple > 0:
-        suggested_packs = np.ceil(suggested_packs / order_multiple) * order_multiple
+        suggested_packs = math.ceil(suggested_packs / order_multiple) * order_multiple
 
     return {
         'suggested_quantity_packs': int(suggested_packs),
         'suggested_quantity_units': int(suggested_packs * pack_size),
-        'reorder_point_packs': int(np.ceil(reorder_point / pack_size)) if pack_size > 0 else int(reorder_point),
-        'safety_stock_packs': int(np.ceil(safety_stock / pack_size)) if pack_size > 0 else int(safety_stock),
-        'lead_time_demand_packs': int(np.ceil(lead_time_usage / pack_size)) if pack_size > 0 else int(lead_time_usage)
+        'reorder_point_packs': math.ceil(reorder_point / pack_size) if pack_size > 0 else int(reorder_point),
+        'safety_stock_packs': math.ceil(safety_stock / pack_size) if pack_size > 0 else int(safety_stock),
+        'lead_time_demand_packs': math.ceil(lead_time_usage / pack_size) if pack_size > 0 else int(lead_time_usage)
     }
 
+def calculate_reorder_quantity_batch(
+    monthly_usage,
+    lead_time_days,
+    safety_stock_weeks,
+    current_stock,
+    pack_size
+) -> List[Dict]:
+    """
+    Vectorized calculate_reorder_quantity over a batch of products (no order multiple)
+
+    Args:
+        monthly_usage: Array-like of average monthly consumption, one entry per product
+        lead_time_days: Array-like of supplier lead times in days
+        safety_stock_weeks: Safety stock buffer in weeks (scalar or array-like)
+        current_stock: Array-like of current available stock
+        pack_size: Array-like of units per pack
+
+    Returns:
+        Reorder calculations per product, identical to calling
+        calculate_reorder_quantity per product
+    """
+    monthly = np.asarray(monthly_usage, dtype=np.float64)
+    lead_days = np.asarray(lead_time_days, dtype=np.float64)
+    safety_weeks = np.asarray(safety_stock_weeks, dtype=np.float64)
+    stock = np.asarray(current_stock, dtype=np.float64)
+    packs = np.asarray(pack_size, dtype=np.float64)
+
+    # Same operation order as the scalar version
+    daily_usage = monthly / 30.44
+    lead_time_usage = daily_usage * lead_days
+    safety_stock = daily_usage * 7 * safety_weeks
+    reorder_point = lead_time_usage + safety_stock
+    shortfall = reorder_point - stock
+    suggested_qty = np.where(shortfall > 0, shortfall, 0.0)
+
+    # Ceiling to whole packs; quantities are truncated where there is no pack size
+    has_packs = packs > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        suggested_packs = np.where(has_packs, np.ceil(suggested_qty / packs), suggested_qty)
+        columns = (
+            np.trunc(suggested_packs),
+            np.trunc(suggested_packs * packs),
+            np.where(has_packs, np.ceil(reorder_point / packs), np.trunc(reorder_point)),
+            np.where(has_packs, np.ceil(safety_stock / packs), np.trunc(safety_stock)),
+            np.where(has_packs, np.ceil(lead_time_usage / packs), np.trunc(lead_time_usage))
+        )
+
+    return [
+        {
+            'suggested_quantity_packs': suggested,
+            'suggested_quantity_units': units,
+            'reorder_point_packs': reorder_point_packs,
+            'safety_stock_packs': safety_packs,
+            'lead_time_demand_packs': lead_time_packs
+        }
+        for suggested, units, reorder_point_packs, safety_packs, lead_time_packs in zip(
+            *(column.astype(np.int64).tolist() for column in columns)
+        )
+    ]
+
 def impute_missing_values(
     series: pd.Series,
     method: str = 'linear'
@@ -370,10 +616,22 @@ def impute_missing_values(
     Returns:
         Series with imputed values
     """
-    if method == 'linear':
-        return series.interpolate(method='linear')
-    elif method == 'forward_fill':
-        return series.fillna(method='ffill')
-    else:
-        # Default to linear
+    if method == 'forward_fill':
+        return series.ffill()
+
+    # Linear (also the default); NumPy float series are filled with np.interp directly
+    if not isinstance(series.dtype, np.dtype) or series.dtype.kind != 'f':
         return series.interpolate(method='linear')
+
+    values = series.to_numpy()
+    missing = np.isnan(values)
+    if not missing.any() or missing.all():
+        return series.copy()
+
+    # Positions stand in for the index (as Series.interpolate); leading gaps stay NaN
+    positions = np.arange(len(values))
+    filled = values.copy()
+    filled[missing] = np.interp(positions[missing], positions[~missing], values[~missing])
+    filled[:np.argmin(missing)] = np.nan
+
+    return pd.Series(filled, index=series.index, name=series.name)
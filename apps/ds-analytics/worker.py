@@ -0,0 +1,31 @@
+"""
+Background job worker for DS Analytics
+Runs long client recalculations outside the API worker processes
+
+Start with:
+    arq worker.WorkerSettings
+"""
+import os
+
+from arq.connections import RedisSettings
+
+from main import recalculate_client_usage_background
+
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+
+async def recalculate_client_usage(ctx: dict, client_id: str) -> None:
+    """arq job wrapper around the client recalculation task"""
+    await recalculate_client_usage_background(client_id)
+
+
+class WorkerSettings:
+    """arq worker configuration"""
+    functions = [recalculate_client_usage]
+    redis_settings = RedisSettings.from_dsn(REDIS_URL)
+    job_timeout = int(os.getenv("RECALC_JOB_TIMEOUT_SECONDS", "3600"))  # Full-client recalcs can run long
+    max_jobs = int(os.getenv("RECALC_MAX_JOBS", "2"))
+    # Store no results: a kept result key makes arq reject the next job with the
+    # same id, and the API dedupes on a per-client job id only while one is pending
+    keep_result = 0
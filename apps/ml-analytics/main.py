@@ -19,6 +19,7 @@ import numpy as np
 from prophet import Prophet
 from datetime import datetime, timedelta
 import os
+import time
 from sqlalchemy import create_engine, text
 import logging
 from dotenv import load_dotenv
@@ -70,7 +71,7 @@ class CircuitBreaker:
     def __init__(self, name: str):
         self.name = name
         self.failure_count = 0
-        self.last_failure_time: datetime | None = None
+        self.last_failure_time: float | None = None  # time.monotonic() of the last failure
         self.state = "CLOSED"
         self._lock = Lock()
 
@@ -84,7 +85,7 @@ class CircuitBreaker:
         """Record a failed operation, potentially open circuit."""
         with self._lock:
             self.failure_count += 1
-            self.last_failure_time = datetime.now()
+            self.last_failure_time = time.monotonic()
 
             if self.failure_count >= self.FAILURE_THRESHOLD:
                 self.state = "OPEN"
@@ -100,9 +101,8 @@ class CircuitBreaker:
 
             if self.state == "OPEN":
                 # Check if recovery timeout has elapsed
-                if self.last_failure_time:
-                    elapsed = (datetime.now() - self.last_failure_time).total_seconds()
-                    if elapsed >= self.RECOVERY_TIMEOUT:
+                if self.last_failure_time is not None:
+                    if time.monotonic() - self.last_failure_time >= self.RECOVERY_TIMEOUT:
                         self.state = "HALF_OPEN"
                         logger.info(f"Circuit breaker '{self.name}' now HALF_OPEN")
                         return True
@@ -114,11 +114,16 @@ class CircuitBreaker:
     def get_status(self) -> dict:
         """Get current circuit breaker status."""
         with self._lock:
+            last_failure = None
+            if self.last_failure_time is not None:
+                # Monotonic stamp back to wall-clock time, for display only
+                last_failure = datetime.now() - timedelta(seconds=time.monotonic() - self.last_failure_time)
+
             return {
                 "name": self.name,
                 "state": self.state,
                 "failure_count": self.failure_count,
-                "last_failure": self.last_failure_time.isoformat() if self.last_failure_time else None
+                "last_failure": last_failure.isoformat() if last_failure else None
             }
 
 
@@ -253,6 +258,12 @@ def select_forecasting_algorithm(
     return ("prophet", "Sufficient data (100+ points) - using Prophet")
 
 
+# One StatsForecast per algorithm, reused across requests. An instance keeps the
+# state of its last fit, so forecasts on a shared instance run under the lock.
+_statsforecast_cache: dict[str, "StatsForecast"] = {}
+_statsforecast_lock = Lock()
+
+
 def forecast_with_statsforecast(
     df: pd.DataFrame,
     horizon_days: int,
@@ -272,32 +283,33 @@ def forecast_with_statsforecast(
     if not STATSFORECAST_AVAILABLE:
         raise ValueError("statsforecast not installed")
 
-    # Prepare data in StatsForecast format
-    sf_df = df.copy()
-    sf_df['unique_id'] = 'product'  # StatsForecast requires unique_id
-    sf_df = sf_df.rename(columns={'ds': 'ds', 'y': 'y'})
-
-    # Select model based on algorithm
-    if algorithm == "naive":
-        models = [Naive()]
-    elif algorithm == "ses":
-        models = [SimpleExponentialSmoothing(alpha=0.3)]
-    elif algorithm == "ets":
-        models = [AutoETS(season_length=7)]  # Weekly seasonality
-    elif algorithm == "croston":
-        models = [CrostonSBA()]
-    else:
-        raise ValueError(f"Unknown algorithm: {algorithm}")
-
-    # Create and fit StatsForecast
-    sf = StatsForecast(
-        models=models,
-        freq='D',  # Daily frequency
-        n_jobs=1   # Single-threaded for API use
-    )
+    # Prepare data in StatsForecast format (requires unique_id; the input is not modified)
+    sf_df = df.assign(unique_id='product')
+
+    with _statsforecast_lock:
+        sf = _statsforecast_cache.get(algorithm)
+        if sf is None:
+            # Select model based on algorithm
+            if algorithm == "naive":
+                models = [Naive()]
+            elif algorithm == "ses":
+                models = [SimpleExponentialSmoothing(alpha=0.3)]
+            elif algorithm == "ets":
+                models = [AutoETS(season_length=7)]  # Weekly seasonality
+            elif algorithm == "croston":
+                models = [CrostonSBA()]
+            else:
+                raise ValueError(f"Unknown algorithm: {algorithm}")
+
+            sf = StatsForecast(
+                models=models,
+                freq='D',  # Daily frequency
+                n_jobs=1   # Single-threaded for API use
+            )
+            _statsforecast_cache[algorithm] = sf
 
-    # Generate forecast
-    forecast = sf.forecast(df=sf_df, h=horizon_days)
+        # Fit and generate forecast
+        forecast = sf.forecast(df=sf_df, h=horizon_days)
 
     # Get the prediction column name (varies by model)
     pred_col = [c for c in forecast.columns if c not in ['unique_id', 'ds']][0]
@@ -311,9 +323,6 @@ def forecast_with_statsforecast(
     })
 
     # Calculate simple metrics
-    # For statsforecast, we use training data residuals
-    fitted = sf.forecast(df=sf_df, h=1, fitted=True) if hasattr(sf, 'forecast_fitted_values') else None
-
     metrics = {
         "mape": 0.0,  # Would need cross-validation for accurate MAPE
         "rmse": 0.0,